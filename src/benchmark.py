@@ -0,0 +1,192 @@
+"""
+Benchmarks of the simulation hot paths, with results saved as JSON so that runs on different commits can be
+compared.
+
+Every case is timed over a few repeats (the fastest is kept), then run once more under `tracemalloc` to
+measure its peak memory. Examples:
+
+    python benchmark.py --quick --output before.json
+    python benchmark.py --quick --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from unittest.mock import patch
+import matplotlib
+
+matplotlib.use("Agg")  # Plots are rendered off screen
+import matplotlib.pyplot as plt
+import numpy as np
+import kernels
+from functions import find_closest_location
+from plot import plot_fire, grid_to_rgb
+from seeds import initialize_grid
+from simulate import simulate_fire, calculate_humidity_and_temperature
+from spatial import LocationIndex
+
+SIZES = [50, 200, 500, 1000, 2000]
+QUICK_SIZES = [50, 200]
+WATER_RATIOS = [0.05, 0.2]
+WINDS = [(0, "N"), (10, "E")]
+REALIZATIONS = [1, 10]
+
+# Largest grid side simulated with each engine; the others would take minutes per case
+ENGINE_MAX_SIZE = {"loop": 100, "numpy": 500, "frontier": 2000, "event": 2000}
+
+
+def measure(function, repeats=3, memory=True):
+    """
+    Time `function()` and measure its peak memory.
+
+    Returns:
+    --------
+    tuple
+        - float: Fastest time over `repeats` calls, in seconds.
+        - int or None: Peak memory allocated during one more call, in bytes.
+        - object: The value returned by the last timed call.
+    """
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        value = function()
+        seconds.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(seconds), peak, value
+
+
+def landscape(size, water_ratio=0.1):
+    """A reproducible size x size landscape with the fire in the middle."""
+    return initialize_grid(size, size, water_ratio, (size // 2, size // 2), rng=0)
+
+
+def draw_without_pause(interval):
+    """Stand-in for `plt.pause` that draws the figure without sleeping, so plots are timed by their rendering."""
+    plt.gcf().canvas.draw()
+
+
+def benchmark_cases(sizes):
+    """
+    Yield the benchmark cases for the given grid sizes as (name, parameters, function, cells) tuples,
+    where `cells` is the number of grid cells the function processes. Every case runs on landscapes of each
+    of the `WATER_RATIOS`, since water sets both the cost of the humidity computation and the fire extent.
+    """
+    for size in sizes:
+        for water_ratio in WATER_RATIOS:
+            parameters = {"size": size, "water_ratio": water_ratio}
+            yield ("initialize_grid", parameters,
+                   lambda size=size, water_ratio=water_ratio: landscape(size, water_ratio), size * size)
+
+            grid, tree_types = landscape(size, water_ratio)
+            yield ("calculate_humidity_and_temperature", parameters,
+                   lambda grid=grid: calculate_humidity_and_temperature(grid, "summer"), size * size)
+            yield ("grid_to_rgb", parameters,
+                   lambda grid=grid, tree_types=tree_types: grid_to_rgb(grid, tree_types), size * size)
+
+            def render(grid=grid, tree_types=tree_types):
+                with patch.object(plt, "pause", draw_without_pause):
+                    plot_fire(grid, tree_types, 0)
+            yield "plot_fire", parameters, render, size * size
+
+            # Index the landscape and build its KD-tree outside the timed section, so only the lookups are timed
+            centers = np.random.default_rng(0).integers(0, size, (100, 2))
+            index = LocationIndex(grid, tree_types)
+            index.nearest("non_bush", centers[:1])
+            yield ("find_closest_location", dict(parameters, centers=len(centers)),
+                   lambda grid=grid, tree_types=tree_types, centers=centers, index=index: [
+                       find_closest_location(grid, tree_types, "non_bush", tuple(center), index=index)
+                       for center in centers],
+                   size * size)
+
+            for engine, max_size in ENGINE_MAX_SIZE.items():
+                if size > max_size:
+                    continue
+                for wind_speed, wind_direction in WINDS:
+                    for simulations in REALIZATIONS:
+                        yield ("simulate_fire",
+                               dict(parameters, engine=engine, wind_speed=wind_speed, wind_direction=wind_direction,
+                                    simulations=simulations),
+                               lambda grid=grid, tree_types=tree_types, engine=engine, wind_speed=wind_speed,
+                               wind_direction=wind_direction, simulations=simulations: simulate_fire(
+                                   grid, tree_types, wind_speed, wind_direction, simulations, season="summer",
+                                   engine=engine, seed=0),
+                               size * size)
+
+
+def run_benchmarks(sizes, repeats=3, memory=True, only=None):
+    """
+    Run the benchmark cases and return one result dict per case.
+
+    Besides the case name and parameters, every result holds the time in seconds, the grid cells processed
+    per second and the peak memory in bytes. Fire simulations also report the number of simulated hours,
+    the time per simulated hour and the cell-hours simulated per second.
+    """
+    results = []
+    for name, parameters, function, cells in benchmark_cases(sizes):
+        if only and name not in only:
+            continue
+        seconds, peak, value = measure(function, repeats, memory)
+        result = {"benchmark": name, "parameters": parameters, "seconds": seconds,
+                  "cells_per_second": cells / seconds, "peak_memory_bytes": peak}
+        if name == "simulate_fire":
+            hours = int(value[1]["duration"].sum())
+            result.update(hours=hours, seconds_per_hour=seconds / max(hours, 1),
+                          cells_per_second=cells * hours / seconds)
+        results.append(result)
+        print(f"{name:36} {json.dumps(parameters):90} {seconds:10.4f} s")
+    return results
+
+
+def environment_metadata():
+    """Commit, versions and machine the benchmarks ran on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "timestamp": datetime.now(timezone.utc).isoformat(), "python": platform.python_version(),
+            "numpy": np.__version__, "numba": kernels.numba and kernels.numba.__version__, "kernels": kernels.ENABLED,
+            "machine": platform.machine(), "processor": platform.processor(), "system": platform.platform()}
+
+
+def compare(results, baseline):
+    """Print the time of every case relative to the same case in a baseline results file."""
+    def key(result):
+        return result["benchmark"], json.dumps(result["parameters"], sort_keys=True)
+
+    baseline_seconds = {key(result): result["seconds"] for result in baseline["results"]}
+    print(f"\nCompared with {baseline['metadata'].get('commit')} (ratio > 1 is slower):")
+    for result in results:
+        if key(result) in baseline_seconds:
+            ratio = result["seconds"] / baseline_seconds[key(result)]
+            print(f"{result['benchmark']:36} {json.dumps(result['parameters']):90} {ratio:8.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the fire simulation hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", help=f"Grid sides to benchmark (default {SIZES}).")
+    parser.add_argument("--quick", action="store_true", help=f"Only benchmark grid sides {QUICK_SIZES}.")
+    parser.add_argument("--only", nargs="+", help="Only run the benchmarks with these names.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per case; the fastest is kept.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory measurement.")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file to write the results to.")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with.")
+    args = parser.parse_args()
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    benchmark_results = run_benchmarks(sizes, args.repeats, not args.no_memory, args.only)
+    with open(args.output, "w") as file:
+        json.dump({"metadata": environment_metadata(), "results": benchmark_results}, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(benchmark_results, json.load(file))
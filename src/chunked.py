@@ -0,0 +1,163 @@
+import numpy as np
+from environment import WATER_OFFSETS
+
+# Cells this far from a flammable cell can change its humidity (water) or temperature (fire)
+REACH = max(max(abs(dr), abs(dc)) for dr, dc, _ in WATER_OFFSETS)
+
+
+class ChunkedGrid:
+    """
+    A 2D grid stored as square chunks, of which only those the fire simulation can see are kept as arrays.
+
+    A chunk is materialized when it holds flammable (1, 5) or burning (2) cells, or when it lies next to
+    such a chunk and its cells are not all the same, since water up to `REACH` cells away sets the
+    humidity of flammable cells. Every other chunk is stored as a single value, the most common value of
+    its cells, so landscapes dominated by water, rock and bare ground take a fraction of the memory of a
+    dense array. Away from vegetation, the chunks reduced to one value lose their detail.
+
+    Parameters:
+    -----------
+    shape : tuple of int
+        (rows, cols) of the grid.
+    chunk_size : int
+        Side of the chunks.
+    index : numpy.ndarray
+        (chunk rows, chunk cols) position in `blocks` of every materialized chunk, -1 for the others.
+    values : numpy.ndarray
+        (chunk rows, chunk cols) value of the chunks that are not materialized.
+    blocks : numpy.ndarray
+        (materialized chunks, chunk_size, chunk_size) values of the materialized chunks, e.g. memory-mapped.
+
+    Examples:
+    ---------
+    >>> grid = np.full((8, 12), 3, dtype=np.uint8)  # A lake with a few trees in its top left corner
+    >>> grid[1, 1:3] = 1
+    >>> chunked = ChunkedGrid.from_dense(grid, chunk_size=4)
+    >>> chunked.index
+    array([[ 0, -1, -1],
+           [-1, -1, -1]])
+    >>> chunked.get(np.array([12, 13, 95]))
+    array([3, 1, 3], dtype=uint8)
+    >>> np.array_equal(chunked.to_dense(), grid)
+    True
+    """
+
+    def __init__(self, shape, chunk_size, index, values, blocks):
+        self.shape = tuple(shape)
+        self.chunk_size = chunk_size
+        self.index = index
+        self.values = values
+        self.blocks = blocks
+        self.dtype = blocks.dtype
+
+    @classmethod
+    def from_dense(cls, grid, chunk_size=256, layout=None, dtype=None):
+        """
+        Chunk a dense grid of cell codes.
+
+        Parameters:
+        -----------
+        grid : numpy.ndarray
+            A 2D array, e.g. a grid of cell codes or a memory-mapped grid from `storage.load_scenario`.
+        chunk_size : int, optional
+            Side of the chunks, at least `REACH`. Default is 256.
+        layout : ChunkedGrid, optional
+            Materialize the same chunks as this grid, e.g. to chunk the tree types of a chunked grid. By
+            default `grid` is taken as cell codes and its chunks are chosen as described in the class.
+        dtype : numpy.dtype, optional
+            Type of the stored values. Defaults to the type of `grid`.
+
+        Returns:
+        --------
+        ChunkedGrid
+        """
+        if layout is not None:
+            chunk_size = layout.chunk_size
+        elif chunk_size < REACH:
+            raise ValueError(f"chunk_size must be at least {REACH}.")
+        rows, cols = grid.shape
+        chunk_rows, chunk_cols = -(-rows // chunk_size), -(-cols // chunk_size)
+        chunks = [np.s_[r:r + chunk_size, c:c + chunk_size]
+                  for r in range(0, rows, chunk_size) for c in range(0, cols, chunk_size)]
+
+        if layout is not None:
+            materialized = layout.index.ravel() >= 0
+        else:
+            live = np.zeros(len(chunks), dtype=bool)
+            uniform = np.zeros(len(chunks), dtype=bool)
+            for k, chunk in enumerate(chunks):
+                block = grid[chunk]
+                live[k] = ((block == 1) | (block == 2) | (block == 5)).any()
+                uniform[k] = block.min() == block.max()
+            padded = np.pad(live.reshape(chunk_rows, chunk_cols), 1)
+            near_live = np.logical_or.reduce([padded[1 + dr:1 + dr + chunk_rows, 1 + dc:1 + dc + chunk_cols]
+                                              for dr in (-1, 0, 1) for dc in (-1, 0, 1)]).ravel()
+            materialized = live | (near_live & ~uniform)
+
+        index = np.where(materialized, np.cumsum(materialized) - 1, -1)
+        blocks = np.zeros((int(materialized.sum()), chunk_size, chunk_size), dtype=dtype or grid.dtype)
+        values = np.zeros(len(chunks), dtype=blocks.dtype)
+        for k, chunk in enumerate(chunks):
+            block = np.asarray(grid[chunk])
+            if index[k] >= 0:
+                blocks[index[k], :block.shape[0], :block.shape[1]] = block
+            else:
+                unique, counts = np.unique(block, return_counts=True)
+                values[k] = unique[np.argmax(counts)]
+        return cls(grid.shape, chunk_size, index.reshape(chunk_rows, chunk_cols),
+                   values.reshape(chunk_rows, chunk_cols), blocks)
+
+    def full_like(self, value, dtype=None, blocks=None):
+        """
+        Return a grid with the same chunks, with every cell set to `value`. The values of the materialized
+        chunks are written to `blocks` if given, e.g. a memory-mapped array.
+        """
+        if blocks is None:
+            blocks = np.empty(self.blocks.shape, dtype=dtype or self.dtype)
+        blocks[:] = value
+        return ChunkedGrid(self.shape, self.chunk_size, self.index, np.full_like(self.values, value, blocks.dtype),
+                           blocks)
+
+    @property
+    def nbytes(self):
+        """Memory taken by the values of the grid, in bytes."""
+        return self.index.nbytes + self.values.nbytes + self.blocks.nbytes
+
+    def _locate(self, cells):
+        """Chunk, position in `blocks`, and row and column within the chunk of flat `cells`."""
+        r, c = np.divmod(cells, self.shape[1])
+        chunk = (r // self.chunk_size) * self.index.shape[1] + c // self.chunk_size
+        return chunk, self.index.flat[chunk], r % self.chunk_size, c % self.chunk_size
+
+    def get(self, cells):
+        """Return the values of flat `cells`, like `grid.flat[cells]` for a dense grid."""
+        chunk, slot, r, c = self._locate(cells)
+        values = self.values.flat[chunk]
+        stored = slot >= 0
+        values[stored] = self.blocks[slot[stored], r[stored], c[stored]]
+        return values
+
+    def set(self, cells, values):
+        """Set the values of flat `cells`, which must lie in materialized chunks."""
+        _, slot, r, c = self._locate(cells)
+        if (slot < 0).any():
+            raise ValueError("Cells outside the materialized chunks cannot be set.")
+        self.blocks[slot, r, c] = values
+
+    def window(self, top, bottom, left, right):
+        """Return the dense array of the cells in rows `top:bottom` and columns `left:right`."""
+        size = self.chunk_size
+        result = np.empty((bottom - top, right - left), dtype=self.dtype)
+        for chunk_row in range(top // size, (bottom - 1) // size + 1):
+            for chunk_col in range(left // size, (right - 1) // size + 1):
+                r0, r1 = max(top, chunk_row * size), min(bottom, (chunk_row + 1) * size)
+                c0, c1 = max(left, chunk_col * size), min(right, (chunk_col + 1) * size)
+                slot = self.index[chunk_row, chunk_col]
+                result[r0 - top:r1 - top, c0 - left:c1 - left] = self.values[chunk_row, chunk_col] if slot < 0 else \
+                    self.blocks[slot, r0 - chunk_row * size:r1 - chunk_row * size,
+                                c0 - chunk_col * size:c1 - chunk_col * size]
+        return result
+
+    def to_dense(self):
+        """Return the grid as a dense array."""
+        return self.window(0, self.shape[0], 0, self.shape[1])
@@ -1,3 +1,5 @@
+import numpy as np
+
 # Define tree flammability mapping
 tree_flammability: dict[str, float] = {
     "pine": 0.8,  # Pine tree with high flammability
@@ -23,3 +25,60 @@ tree_burn_rates: dict[str, float] = {
     "willow": 10 / 46,  # Willow tree burns the slowest among trees
     "none": 0.0  # Empty or unplanted land does not burn
 }
+
+# Tree types in the order of their integer ids; id 0 is empty or unplanted land
+tree_species: tuple[str, ...] = ("none", "pine", "oak", "willow", "bush")
+
+# Flammability and burn rate of each tree type id, so whole grids of ids can be looked up at once
+species_flammability = np.array([tree_flammability[name] for name in tree_species])
+species_burn_rates = np.array([tree_burn_rates[name] for name in tree_species])
+
+
+def encode_tree_types(tree_types, strict=True):
+    """
+    Convert an array of tree type names to an array of uint8 ids into `tree_species`.
+
+    None gets the id of "none". Arrays that already hold integer ids are returned as uint8. Any other name
+    that is not in `tree_species`, such as a misspelt species, raises a KeyError naming it; with
+    `strict=False` it gets the id of "none" instead, e.g. to color it as empty land or to tell bushes from
+    other labels.
+
+    Example:
+    --------
+    >>> encode_tree_types(np.array([["pine", None], ["bush", "oak"]], dtype=object))
+    array([[1, 0],
+           [4, 2]], dtype=uint8)
+    >>> encode_tree_types(np.array([["pine", "pnie"]]))
+    Traceback (most recent call last):
+    ...
+    KeyError: "Unknown tree species ['pnie'], expected one of ['none', 'pine', 'oak', 'willow', 'bush']."
+    >>> encode_tree_types(np.array([["pine", "pnie"]]), strict=False)
+    array([[1, 0]], dtype=uint8)
+    """
+    tree_types = np.asarray(tree_types)
+    if np.issubdtype(tree_types.dtype, np.integer):
+        return tree_types.astype(np.uint8, copy=False)
+    ids = np.zeros(tree_types.shape, dtype=np.uint8)
+    known = np.equal(tree_types, None) if tree_types.dtype == object else np.zeros(tree_types.shape, dtype=bool)
+    for species_id, name in enumerate(tree_species):
+        matches = tree_types == name
+        ids[matches] = species_id
+        known |= matches
+    if strict and not known.all():
+        unknown = sorted(set(map(str, tree_types[~known].tolist())))
+        raise KeyError(f"Unknown tree species {unknown}, expected one of {list(tree_species)}.")
+    return ids
+
+
+def decode_tree_types(tree_type_ids):
+    """
+    Convert an array of tree type ids back to tree type names, with None where there is no tree.
+
+    Example:
+    --------
+    >>> decode_tree_types(np.array([[1, 0], [4, 2]], dtype=np.uint8))
+    array([['pine', None],
+           ['bush', 'oak']], dtype=object)
+    """
+    names = np.array([None] + list(tree_species[1:]), dtype=object)
+    return names[tree_type_ids]
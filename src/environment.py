@@ -0,0 +1,201 @@
+import numpy as np
+import kernels
+
+
+# Baseline (humidity, temperature in °C) for each season; None is the default season
+SEASON_CONDITIONS = {
+    'summer': (0.1, 30),
+    'winter': (0.4, 12),
+    None: (0.2, 24),
+}
+
+
+def _water_offsets(radius=4):
+    """
+    List the (row offset, column offset, humidity) added by a water cell to the cells around it.
+
+    A water cell adds 0.8 / (distance + 3) to every cell within Manhattan distance `radius`. The offsets
+    are listed so that, seen from the receiving cell, the water cells come in row-major order; summing
+    in this order gives exactly the same floating point values as visiting the water cells one by one.
+    """
+    return [(dr, dc, 0.8 / (abs(dr) + abs(dc) + 3))
+            for dr in range(radius, -radius - 1, -1)
+            for dc in range(radius, -radius - 1, -1)
+            if 0 < abs(dr) + abs(dc) <= radius]
+
+
+WATER_OFFSETS = _water_offsets()
+_WATER_OFFSET_TABLE = np.array(WATER_OFFSETS)  # For `kernels.water_humidity`
+
+
+def neighbourhood_sum(values, offsets, initial=0):
+    """
+    Add `weight * values[r - dr, c - dc]` to `initial` for each (dr, dc, weight) in `offsets`, in the order
+    given, for every cell. Cells outside the grid count as zero.
+
+    Examples:
+    ---------
+    >>> neighbourhood_sum(np.array([[0, 1, 0], [0, 0, 0]]), [(0, 0, 1), (1, 0, 2), (0, 1, 3)])
+    array([[0, 1, 3],
+           [0, 2, 0]])
+    """
+    rows, cols = values.shape[-2:]
+    radius = max(max(abs(dr), abs(dc)) for dr, dc, _ in offsets)
+    padded = np.pad(values, [(0, 0)] * (values.ndim - 2) + [(radius, radius), (radius, radius)])
+    total = np.full(values.shape, initial, dtype=np.result_type(values, initial, *[w for _, _, w in offsets]))
+    for dr, dc, weight in offsets:
+        total += weight * padded[..., radius - dr:radius - dr + rows, radius - dc:radius - dc + cols]
+    return total
+
+
+# Each fire cell heats its 3x3 area
+FIRE_OFFSETS = [(dr, dc, 1) for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+
+
+class FireEnvironment:
+    """
+    Humidity and temperature of a grid, kept up to date as the fire front moves.
+
+    Water never moves, so the humidity it brings to the surrounding cells is computed once. Fire cells
+    keep the seasonal humidity and heat their 3x3 area; these contributions are applied incrementally
+    through `update`, so each hour only costs work proportional to the cells that changed.
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray
+        A 2D array representing the simulation grid (3: Water, 2: Fire, other: Terrain), or a stack of
+        such grids along the first axis, one per realization.
+    season : str, optional
+        Season can be 'summer', 'winter', or None (default season).
+
+    Attributes:
+    -----------
+    humidities : numpy.ndarray
+        Current humidity of every cell.
+    temperatures : numpy.ndarray
+        Current temperature of every cell.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[0, 3, 0], [0, 0, 2], [3, 0, 0]])
+    >>> environment = FireEnvironment(grid, season='summer')
+    >>> environment.temperatures
+    array([[30, 33, 35],
+           [30, 35, 37],
+           [28, 35, 35]])
+    >>> new_grid = np.array([[0, 3, 0], [2, 0, 4], [3, 0, 0]])  # (1, 0) caught fire, (1, 2) burned out
+    >>> environment.update(ignited=np.array([3]), extinguished=np.array([5]))
+    >>> environment.temperatures
+    array([[35, 33, 30],
+           [37, 35, 30],
+           [33, 35, 30]])
+    >>> np.array_equal(environment.temperatures, FireEnvironment(new_grid, season='summer').temperatures)
+    True
+    """
+
+    def __init__(self, grid, season=None):
+        self.season = season
+        self.base_humidity, self.base_temperature = SEASON_CONDITIONS.get(season, SEASON_CONDITIONS[None])
+        water = grid == 3
+        fire = grid == 2
+
+        # Humidity brought by water (grid value 3) to every non-water cell, capped at 0.85
+        if kernels.ENABLED:
+            humidities = kernels.water_humidity(water, _WATER_OFFSET_TABLE, self.base_humidity)
+        else:
+            humidities = neighbourhood_sum(water, WATER_OFFSETS, initial=self.base_humidity)
+        self.water_humidities = np.minimum(humidities, 0.85)
+        self.water_humidities[water] = 0.8
+
+        # Fire cells are not affected by water
+        self.humidities = self.water_humidities.copy()
+        self.humidities[fire] = self.base_humidity
+
+        # Number of fire cells in the 3x3 area of every cell
+        self.fire_counts = neighbourhood_sum(fire.astype(int), FIRE_OFFSETS)
+        self.temperatures = self._temperature(self.fire_counts, self.humidities)
+
+    def _temperature(self, fire_counts, humidities):
+        """Temperature of cells given their fire counts and humidities."""
+        # +5°C for each fire cell in the 3x3 area, capped at 100°C
+        temperatures = np.minimum(self.base_temperature + 5 * fire_counts, 100)
+
+        # Adjust temperature based on humidity (e.g., cooler near water, warmer near fire)
+        return np.where(humidities > 0.7, np.maximum(temperatures - 2, 0),  # Reduce temperature if near water
+                        np.where(humidities < 0.3, np.minimum(temperatures + 2, 100),  # Increase in dry areas
+                                 temperatures))
+
+    def temperature_levels(self):
+        """
+        Return the temperature of a cell given its humidity level and fire count, as a (3, 10) table, and the
+        humidity level of every cell when it is not burning: 0 above 0.7, 1 in between and 2 below 0.3.
+
+        Examples:
+        ---------
+        >>> environment = FireEnvironment(np.array([[0, 3, 0]]), season='summer')
+        >>> table, levels = environment.temperature_levels()
+        >>> levels
+        array([[1, 0, 1]], dtype=uint8)
+        >>> table[levels, 2]  # Temperatures with two fire cells nearby
+        array([[40, 38, 40]])
+        """
+        table = np.stack([self._temperature(np.arange(10), humidity) for humidity in (1.0, 0.5, 0.0)])
+        levels = np.where(self.water_humidities > 0.7, 0, np.where(self.water_humidities < 0.3, 2, 1))
+        return table, levels.astype(np.uint8)
+
+    def copy(self):
+        """Return an independent copy, e.g. to start another realization from the same grid."""
+        environment = object.__new__(FireEnvironment)
+        environment.__dict__.update({name: value.copy() if isinstance(value, np.ndarray) else value
+                                     for name, value in self.__dict__.items()})
+        return environment
+
+    def take(self, realizations):
+        """Return the environment of the given realizations of a stacked environment."""
+        environment = object.__new__(FireEnvironment)
+        environment.__dict__.update({name: value[realizations] if isinstance(value, np.ndarray) else value
+                                     for name, value in self.__dict__.items()})
+        return environment
+
+    def repeat(self, count):
+        """Return a stacked environment holding `count` copies of this one."""
+        environment = object.__new__(FireEnvironment)
+        environment.__dict__.update({name: np.repeat(value[np.newaxis], count, axis=0)
+                                     if isinstance(value, np.ndarray) else value
+                                     for name, value in self.__dict__.items()})
+        return environment
+
+    def update(self, ignited, extinguished):
+        """
+        Apply the cells that caught fire and the cells that stopped burning since the last update.
+
+        Parameters:
+        -----------
+        ignited : numpy.ndarray
+            Flat indices of the cells that are now on fire.
+        extinguished : numpy.ndarray
+            Flat indices of the cells that are no longer on fire.
+        """
+        rows, cols = self.fire_counts.shape[-2:]
+        changed = np.concatenate([ignited, extinguished])
+        if changed.size == 0:
+            return
+
+        self.humidities.flat[ignited] = self.base_humidity
+        self.humidities.flat[extinguished] = self.water_humidities.flat[extinguished]
+
+        # Add or remove the heat of each changed cell in its 3x3 area
+        plane, cell = np.divmod(changed, rows * cols)
+        r, c = np.divmod(cell, cols)
+        sign = np.concatenate([np.ones(ignited.size, dtype=int), -np.ones(extinguished.size, dtype=int)])
+        affected = []
+        for dr, dc, _ in FIRE_OFFSETS:
+            nr, nc = r + dr, c + dc
+            inside = (nr >= 0) & (nr < rows) & (nc >= 0) & (nc < cols)
+            cells = (plane[inside] * rows + nr[inside]) * cols + nc[inside]
+            np.add.at(self.fire_counts.reshape(-1), cells, sign[inside])
+            affected.append(cells)
+
+        affected = np.unique(np.concatenate(affected))
+        self.temperatures.flat[affected] = self._temperature(self.fire_counts.flat[affected],
+                                                             self.humidities.flat[affected])
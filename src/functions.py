@@ -3,6 +3,8 @@ import matplotlib.pyplot as plt
 from scipy.ndimage import distance_transform_edt
 from plot import create_heatmap, plot_single_heatmap
 from simulate import simulate_fire
+from sweep import run_starts
+from spatial import LocationIndex, LOCATION_TYPES
 import numpy as np
 import pandas as pd
 
@@ -33,21 +35,23 @@ def clear_and_set_fire(grid, start_point):
     return grid_copy
 
 
-def find_closest_location(grid, tree_types, target_type, center):
+def find_closest_location(grid, tree_types, target_type, center, index=None):
     """
     Finds the location of a specific type (bush or non-bush) closest to the given center point.
 
     Steps:
-    1. Determines the locations of cells matching the target type:
+    1. Determines the locations of cells matching the target type, indexed by a spatial.LocationIndex:
        - "bush": Cells with value 5 in the grid.
        - "non_bush": Cells with value 1 and tree type not labeled as "bush."
-    2. Computes the squared Euclidean distance from each candidate location to the center point.
-    3. Returns the location with the smallest distance.
+    2. Finds the location with the smallest Euclidean distance to the center point, the first in row-major
+       order in case of a tie.
 
     :param grid: numpy array, the simulation grid with numerical representations of objects.
-    :param tree_types: numpy array, grid labeling each cell as 'bush' or 'non_bush'.
+    :param tree_types: numpy array, grid labeling each cell as 'bush' or 'non_bush', or tree type ids from
+        data.encode_tree_types.
     :param target_type: str, the type to search for ('bush' or 'non_bush').
     :param center: tuple[int, int], coordinates of the center point to measure distances.
+    :param index: spatial.LocationIndex, optional, an index of the grid to reuse across queries.
     :return: tuple[int, int] or None, the closest location of the target type, or None if not found.
 
     Example:
@@ -56,55 +60,45 @@ def find_closest_location(grid, tree_types, target_type, center):
     >>> find_closest_location(grid, tree_types, "bush", center=(0, 0))
     (0, 0)
     """
-    if target_type == "bush":
-        locations = list(zip(*np.where(grid == 5)))  # Find all Bush locations
-    elif target_type == "non_bush":
-        locations = list(zip(*np.where((grid == 1) & (tree_types != "bush"))))  # Find all Non-Bush locations
-    else:
+    if target_type not in LOCATION_TYPES:
         raise ValueError("Invalid target_type. Use 'bush' or 'non_bush'.")
+    if index is None:
+        index = LocationIndex(grid, tree_types)
 
-    # Calculate distances from the center point to each location
-    distances = [((loc[0] - center[0]) ** 2 + (loc[1] - center[1]) ** 2, loc) for loc in locations]
-    distances.sort(key=lambda x: x[0])  # Sort locations by distance
-
-    return distances[0][1] if distances else None  # Return the closest location or None
+    if index.locations[target_type].size == 0:
+        return None  # No location of the target type
+    return tuple(int(x) for x in index.closest(target_type, [center])[0])  # Return the closest location
 
 
-def simulate_multiple_starts(grid, tree_types, start_locations, wind_speed, wind_direction):
+def simulate_multiple_starts(grid, tree_types, start_locations, wind_speed, wind_direction, simulations=1, **kwargs):
     """
     Simulates multiple fire starting scenarios, recording results for each start point.
 
     Steps:
-    1. For each starting point in start_locations:
-       a. Clears the grid and sets the fire at the current start point.
-       b. Runs a fire simulation with the specified grid, tree types, wind speed, and wind direction.
-       c. Collects the results into a list.
-    2. Combines results from all simulations into a single DataFrame.
+    1. Clears the fires of the grid and computes the environment once for all start points.
+    2. For each starting point in start_locations, runs fire simulations with the fire set at that point,
+       with the specified grid, tree types, wind speed, and wind direction.
+    3. Combines results from all simulations into a single DataFrame.
 
     :param grid: numpy array, the simulation grid.
     :param tree_types: numpy array, grid labeling each cell's type.
     :param start_locations: list of tuples, coordinates of fire starting points.
     :param wind_speed: float, the speed of the wind affecting fire spread.
     :param wind_direction: str, the direction of the wind (e.g., 'N', 'E', 'S', 'W').
+    :param simulations: int, number of simulations for each starting point.
+    :param kwargs: other options of sweep.run_starts, e.g. engine, batch_size, workers or seed.
     :return: pandas DataFrame, consolidated simulation results for all starting points.
 
     Example:
     >>> grid = np.zeros((5, 5))
     >>> tree_types = np.array([['bush'] * 5] * 5)
-    >>> start_locations = [(2, 2)]
-    >>> simulate_multiple_starts(grid, tree_types, start_locations, wind_speed=1, wind_direction="E").empty
-    False
+    >>> start_locations = [(2, 2), (0, 4)]
+    >>> results = simulate_multiple_starts(grid, tree_types, start_locations, wind_speed=1, wind_direction="E")
+    >>> results[["start_row", "start_col"]].values.tolist()
+    [[2, 2], [0, 4]]
     """
-    all_results = []
-
-    for start_point in start_locations:
-        grid_with_fire = clear_and_set_fire(grid, start_point)
-        _, simulation_results = simulate_fire(grid_with_fire, tree_types, wind_speed, wind_direction, simulations=1)
-        all_results.append(simulation_results)
-        break  # Stops after one simulation
-
-    # Combine results from all simulations into a single DataFrame
-    combined_results = pd.concat(all_results, ignore_index=True)
+    combined_results, _ = run_starts(grid, tree_types, start_locations, wind_speed, wind_direction, simulations,
+                                     **kwargs)
     return combined_results
 
 
@@ -134,8 +128,10 @@ def compare_bush_non_bush(grid, tree_types, wind_speed, wind_direction):
     False
     """
     center_point = (25, 25)  # Center point for distance calculations
-    closest_bush = find_closest_location(grid, tree_types, target_type="bush", center=center_point)
-    closest_non_bush = find_closest_location(grid, tree_types, target_type="non_bush", center=center_point)
+    index = LocationIndex(grid, tree_types)  # Shared by both queries
+    closest_bush = find_closest_location(grid, tree_types, target_type="bush", center=center_point, index=index)
+    closest_non_bush = find_closest_location(grid, tree_types, target_type="non_bush", center=center_point,
+                                             index=index)
 
     results_bush = pd.DataFrame()
     results_non_bush = pd.DataFrame()
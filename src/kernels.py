@@ -0,0 +1,122 @@
+"""
+Loop kernels for the hot paths of the simulation, compiled with Numba when it is installed.
+
+The kernels are plain Python functions over NumPy arrays. With Numba they are compiled on first use and
+`ENABLED` is True, so `simulate.SimulationState` and `environment.FireEnvironment` call them instead of
+their whole-array NumPy code; without Numba they are left uncompiled and unused. Either way the results
+are identical: the kernels only gather cells and count, and every floating point operation and random
+draw happens in the same order as in the NumPy code. Set `ENABLED` to False to force the NumPy code.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Numba is optional
+    numba = None
+
+ENABLED = numba is not None
+
+
+def _jit(function):
+    """Compile `function` with Numba if it is installed."""
+    return function if numba is None else numba.njit(cache=True, nogil=True)(function)
+
+
+@_jit
+def spread_targets(codes, counters, next_codes, directions):
+    """
+    Find the ignition attempts of an hour in one pass over a (realizations, rows, cols) stack of grids.
+
+    Copies `codes` to `next_codes`, and returns a (directions, attempts) array whose row i lists, in
+    increasing order, the flat indices of the flammable cells (codes 1 and 5) reached by moving by
+    `directions[i]` from a burning cell whose counter has run out, the number of cells in each row, and
+    the flat indices of the burning cells whose counter has run out.
+
+    Examples:
+    ---------
+    >>> codes = np.array([[[1, 2, 1], [0, 1, 0]]], dtype=np.uint8)
+    >>> targets, counts, active = spread_targets(codes, np.zeros(codes.shape, dtype=np.uint16),
+    ...                                          np.empty_like(codes), np.array([(-1, 0), (1, 0), (0, -1), (0, 1)]))
+    >>> [targets[i, :counts[i]].tolist() for i in range(4)], active
+    ([[], [4], [0], [2]], array([1]))
+    """
+    realizations, rows, cols = codes.shape
+    counts = np.zeros(len(directions), dtype=np.int64)
+    burning = 0
+    for k in range(realizations):
+        for r in range(rows):
+            for c in range(cols):
+                code = codes[k, r, c]
+                next_codes[k, r, c] = code
+                if code == 2 and counters[k, r, c] == 0:
+                    burning += 1
+                elif code == 1 or code == 5:
+                    for i in range(len(directions)):
+                        sr, sc = r - directions[i, 0], c - directions[i, 1]
+                        if 0 <= sr < rows and 0 <= sc < cols and codes[k, sr, sc] == 2 and counters[k, sr, sc] == 0:
+                            counts[i] += 1
+
+    targets = np.empty((len(directions), counts.max()), dtype=np.int64)
+    active = np.empty(burning, dtype=np.int64)
+    filled = np.zeros(len(directions), dtype=np.int64)
+    burning = 0
+    for k in range(realizations):
+        for r in range(rows):
+            for c in range(cols):
+                code = codes[k, r, c]
+                if code == 2 and counters[k, r, c] == 0:
+                    active[burning] = (k * rows + r) * cols + c
+                    burning += 1
+                elif code == 1 or code == 5:
+                    for i in range(len(directions)):
+                        sr, sc = r - directions[i, 0], c - directions[i, 1]
+                        if 0 <= sr < rows and 0 <= sc < cols and codes[k, sr, sc] == 2 and counters[k, sr, sc] == 0:
+                            targets[i, filled[i]] = (k * rows + r) * cols + c
+                            filled[i] += 1
+    return targets, counts, active
+
+
+@_jit
+def count_down(counters, never):
+    """Take an hour off every counter that is neither 0 nor `never`, in place."""
+    flat = counters.reshape(-1)
+    for cell in range(flat.size):
+        if 0 < flat[cell] < never:
+            flat[cell] -= 1
+
+
+@_jit
+def add_fire(fire_counts, cells, amount):
+    """Add `amount` to the fire count of the 3x3 area of each of flat `cells` of a stack, in place."""
+    rows, cols = fire_counts.shape[-2:]
+    flat = fire_counts.reshape(-1)
+    for cell in cells:
+        plane, rest = divmod(cell, rows * cols)
+        r, c = divmod(rest, cols)
+        for nr in range(max(r - 1, 0), min(r + 2, rows)):
+            for nc in range(max(c - 1, 0), min(c + 2, cols)):
+                flat[(plane * rows + nr) * cols + nc] += amount
+
+
+@_jit
+def water_humidity(water, offsets, initial):
+    """
+    Add `weight` to `initial` for every water cell at (r - dr, c - dc) of each cell (r, c), for each row
+    (dr, dc, weight) of `offsets` in turn, as `environment.neighbourhood_sum` does for a boolean `water`.
+
+    Examples:
+    ---------
+    >>> water_humidity(np.array([[True, False, False]]), np.array([(0.0, 1.0, 0.5), (0.0, 2.0, 0.25)]), 0.1)
+    array([[0.1 , 0.6 , 0.35]])
+    """
+    rows, cols = water.shape[-2:]
+    planes = water.reshape(-1, rows, cols)
+    total = np.full(planes.shape, initial)
+    for k in range(planes.shape[0]):
+        for r in range(rows):
+            for c in range(cols):
+                for o in range(offsets.shape[0]):
+                    sr, sc = r - int(offsets[o, 0]), c - int(offsets[o, 1])
+                    if 0 <= sr < rows and 0 <= sc < cols and planes[k, sr, sc]:
+                        total[k, r, c] += offsets[o, 2]
+    return total.reshape(water.shape)
@@ -1,8 +1,9 @@
-import numpy as np
 from simulate import simulate_fire
 from functions import compare_bush_non_bush, plot_fire_and_water_influence, compare_wind_speeds, describe_data, \
     plot_heatmap_and_boxplot
 from seeds import initialize_grid
+from plot import FirePlotter
+from storage import save_scenario, load_scenario, save_burn_probabilities, load_burn_probabilities
 
 """
 
@@ -30,31 +31,13 @@ if __name__ == "__main__":
 
     # Step 1: Generate a grid map and tree types
     # The grid represents the area of simulation, and tree_types indicate the type of vegetation in each cell.
-    grid, tree_types = initialize_grid(rows, cols, 0.05)  # 5% initialization density for trees
+    grid, tree_types = initialize_grid(rows, cols, 0.05, tree_type_ids=True)  # 5% initialization density for trees
 
-    # Save the generated grid to a file for future use
-    with open("data/data_grid.txt", "w") as file:
-        for row in grid:
-            file.write(" ".join(map(str, row)) + "\n")
+    # Save the generated grid and tree types to a binary scenario file for future use
+    save_scenario("data/scenario.bin", grid, tree_types, rows=rows, cols=cols, water_body_ratio=0.05)
 
-    # Save the tree types grid to a file for future use
-    with open("data/data_tree_types.txt", "w") as file:
-        for row in tree_types:
-            file.write(" ".join(map(lambda x: str(x) if x is not None else "None", row)) + "\n")
-
-    # Step 2: Load the saved grid map from files
-    # Load the main grid data
-    with open('data/data_grid.txt', 'r') as file:
-        data = file.readlines()
-    grid = np.array([list(map(int, line.split())) for line in data])
-
-    # Load the tree types data
-    with open('data/data_tree_types.txt', 'r') as file:
-        data = file.readlines()
-    tree_types = np.array([line.split() for line in data])
-
-    # Replace 'None' strings with actual None objects (or np.nan for numerical operations)
-    tree_types = np.where(tree_types == 'None', None, tree_types)
+    # Step 2: Load the saved grid map and tree types, mapped into memory rather than parsed
+    grid, tree_types, _ = load_scenario("data/scenario.bin")
 
     # Hypothesis 1: Compare fire simulation results for bush and non-bush tree types
     combined_results_01 = compare_bush_non_bush(grid, tree_types, wind_speed=0, wind_direction="W")
@@ -67,22 +50,12 @@ if __name__ == "__main__":
     print('Hypothesis 1 simulation complete')
 
     # Hypothesis 2: Simulate fire spread under specific conditions
-    burn_probabilities_02, results_df = simulate_fire(grid, tree_types, 10, 'E', 1, True, 'winter')
+    burn_probabilities_02, results_df = simulate_fire(grid, tree_types, 10, 'E', 1, True, 'winter',
+                                                      observers=[FirePlotter(tree_types)])
 
-    # Save burn probabilities to a file for further analysis
-    output_file_02 = "data/burn_probabilities.txt"
-    with open(output_file_02, "w") as file:
-        rows, cols = burn_probabilities_02.shape
-        for r in range(rows):
-            row_data = " ".join(f"{burn_probabilities_02[r, c]:.4f}" for c in range(cols))
-            file.write(row_data + "\n")
-
-    # Load the saved burn probabilities data
-    file_path_02 = 'data/burn_probabilities.txt'
-    data_02 = np.loadtxt(file_path_02)
-
-    # Reshape the burn probabilities into a 50x50 matrix
-    burn_probabilities_02 = data_02[:2500].reshape(50, 50)
+    # Save burn probabilities to a file for further analysis, and load them back with their saved shape
+    save_burn_probabilities("data/burn_probabilities.npy", burn_probabilities_02)
+    burn_probabilities_02 = load_burn_probabilities("data/burn_probabilities.npy")
 
     # Visualize the influence of fire and water on burn probabilities
     plot_fire_and_water_influence(grid, burn_probabilities_02)
@@ -96,33 +69,18 @@ if __name__ == "__main__":
     combined_results_03, burn_probabilities_03 = compare_wind_speeds(grid, tree_types, wind_speeds_03,
                                                                      wind_direction_03)
 
-    # Save the results of wind-speed-influenced burn probabilities
-    output_file_03 = "data/wind_burn_probabilities.txt"
-    with open(output_file_03, "w") as file:
-        rows, cols = burn_probabilities_03.shape
-        for r in range(rows):
-            row_data = " ".join(f"{burn_probabilities_03[r, c]:.4f}" for c in range(cols))
-            file.write(row_data + "\n")
-
-    # Load and reshape the wind-speed-influenced burn probabilities
-    file_path_03 = 'data/wind_burn_probabilities.txt'
-    data_03 = np.loadtxt(file_path_03)
-    burn_probabilities_03 = data_03[:2500].reshape(50, 50)
+    # Save and reload the results of wind-speed-influenced burn probabilities
+    save_burn_probabilities("data/wind_burn_probabilities.npy", burn_probabilities_03)
+    burn_probabilities_03 = load_burn_probabilities("data/wind_burn_probabilities.npy")
 
     # Save the wind speed comparison results for further analysis
     combined_results_03.to_csv("data/wind_speed_comparison_results_test.csv", index=False)
     print('Hypothesis 3 simulation complete')
 
     # Validation Simulation: Compare fire spread probabilities in different seasons
-    # Load and reshape the burn probabilities for summer
-    file_path_summer = 'data/burn_probabilities_summer.txt'
-    data_summer = np.loadtxt(file_path_summer)
-    burn_probabilities_summer = data_summer[:2500].reshape(50, 50)
-
-    # Load and reshape the burn probabilities for winter
-    file_path_winter = 'data/burn_probabilities_winter.txt'
-    data_winter = np.loadtxt(file_path_winter)
-    burn_probabilities_winter = data_winter[:2500].reshape(50, 50)
+    # Load the burn probabilities for summer and winter
+    burn_probabilities_summer = load_burn_probabilities('data/burn_probabilities_summer.txt')
+    burn_probabilities_winter = load_burn_probabilities('data/burn_probabilities_winter.txt')
 
     # Describe the data for each season to analyze statistical differences
     describe_data(burn_probabilities_winter, 'winter')
@@ -1,7 +1,7 @@
 import matplotlib.pyplot as plt
 from matplotlib.colors import to_rgb  # Import to_rgb from matplotlib.colors
 import numpy as np
-from data import tree_colors
+from data import tree_colors, tree_species, encode_tree_types
 
 
 def plot_fire(grid, tree_types, hours):
@@ -19,8 +19,8 @@ def plot_fire(grid, tree_types, hours):
         - 5 represents areas with reduced fire spread.
         - Any other value represents empty land.
     tree_types : np.ndarray
-        2D array representing the type of trees at each grid position.
-        Each tree type corresponds to a predefined color in `tree_colors`.
+        2D array representing the type of trees at each grid position, as names or as ids from
+        `data.encode_tree_types`. Each tree type corresponds to a predefined color in `tree_colors`.
     hours : int
         The number of hours elapsed in the simulation, used in the plot title.
 
@@ -35,27 +35,8 @@ def plot_fire(grid, tree_types, hours):
     >>> tree_colors = {'oak': 'green'}
     >>> plot_fire(grid, tree_types, 2)  # Visualizes the grid for 2 hours of simulation.
     """
-    # Initialize grid for colored visualization
-    rows, cols = grid.shape
-    grid_colored = np.zeros((rows, cols, 3), dtype=int)  # RGB color grid
-
     # Map grid values to corresponding colors
-    for r in range(rows):
-        for c in range(cols):
-            if grid[r, c] == 1:  # Tree cell
-                tree_type = tree_types[r, c]  # Get tree type at this position
-                tree_color = tree_colors.get(tree_type, "brown")  # Get the tree color, default to brown
-                grid_colored[r, c] = np.array(to_rgb(tree_color)) * 255  # Convert to RGB values
-            elif grid[r, c] == 3:  # Water cell
-                grid_colored[r, c] = np.array(to_rgb("blue")) * 255  # Blue for water
-            elif grid[r, c] == 2:  # Fire cell
-                grid_colored[r, c] = np.array(to_rgb("red")) * 255  # Red for fire
-            elif grid[r, c] == 4:  # Burnt cell
-                grid_colored[r, c] = np.array(to_rgb("black")) * 255  # Black for burnt area
-            elif grid[r, c] == 5:  # Reduced fire spread area
-                grid_colored[r, c] = np.array(to_rgb("mediumseagreen")) * 255  # Medium sea green for reduced spread
-            else:  # Empty land or any other type
-                grid_colored[r, c] = np.array(to_rgb("brown")) * 255  # Brown for empty land
+    grid_colored = grid_to_rgb(grid, tree_types)
 
     # Plot the grid using the colors
     plt.imshow(grid_colored, interpolation='nearest')
@@ -65,6 +46,60 @@ def plot_fire(grid, tree_types, hours):
     plt.clf()  # Clear the figure for the next plot
 
 
+# Colors of the cell types other than trees, which are colored by tree type
+cell_colors: dict[int, str] = {
+    3: "blue",  # Water
+    2: "red",  # Fire
+    4: "black",  # Burnt area
+    5: "mediumseagreen",  # Reduced fire spread area
+}
+
+
+def _color_table():
+    """Build the RGB color of every (cell code, tree type id) pair, for every uint8 cell code."""
+    table = np.empty((256, len(tree_species), 3))
+    table[:] = to_rgb("brown")  # Brown for empty land or any other type
+    for code, color in cell_colors.items():
+        table[code] = to_rgb(color)
+    for species_id, name in enumerate(tree_species):
+        table[1, species_id] = to_rgb(tree_colors.get(name, "brown"))  # Tree cells get the color of their type
+    return (table * 255).astype(np.uint8)
+
+
+COLOR_TABLE = _color_table()
+
+
+def grid_to_rgb(grid, tree_types):
+    """
+    Convert a grid to an RGB image with one lookup into `COLOR_TABLE`.
+
+    Parameters:
+    -----------
+    grid : np.ndarray
+        2D array representing the simulation grid.
+    tree_types : np.ndarray
+        2D array of tree type names, or of tree type ids from `data.encode_tree_types`. Passing ids
+        avoids converting the names again for every frame.
+
+    Returns:
+    --------
+    np.ndarray
+        A (rows, cols, 3) array of uint8 RGB values.
+
+    Example:
+    --------
+    >>> grid_to_rgb(np.array([[1, 2, 0]]), np.array([['oak', 'oak', 'oak']]))
+    array([[[  0, 128,   0],
+            [255,   0,   0],
+            [165,  42,  42]]], dtype=uint8)
+    """
+    codes = np.asarray(grid)
+    if codes.dtype != np.uint8:
+        codes = np.clip(codes, 0, 255).astype(np.uint8)  # Any other value is colored as empty land
+    index = codes.astype(np.uint16) * len(tree_species) + encode_tree_types(tree_types, strict=False)
+    return np.take(COLOR_TABLE.reshape(-1, 3), index, axis=0)
+
+
 def create_heatmap(ax, data, cmap, title, xlabel, ylabel, colorbar_label):
     """
     Helper function to create a heatmap visualization.
@@ -138,3 +173,64 @@ def plot_single_heatmap(data, cmap, title, xlabel, ylabel, colorbar_label):
     create_heatmap(ax, data, cmap, title, xlabel, ylabel, colorbar_label)  # Use the helper function
     plt.tight_layout()  # Adjust the layout to prevent overlap
     plt.show()  # Display the heatmap
+
+
+def plot_burn_probabilities(burn_probabilities):
+    """
+    Plot the burn probabilities of a simulation as a heatmap.
+
+    Parameters:
+    -----------
+    burn_probabilities : numpy.ndarray
+        2D array of the probability that each cell burned.
+
+    Returns:
+    --------
+    None
+
+    Example:
+    --------
+    >>> plot_burn_probabilities(np.array([[0.1, 0.5], [1.0, 0.0]]))
+    """
+    plt.figure(figsize=(10, 5))
+    plt.title("Burn Probabilities Heatmap")
+    plt.imshow(burn_probabilities, cmap="hot", interpolation="nearest")
+    plt.colorbar(label="Burn Probability")
+    plt.show()
+
+
+class FirePlotter:
+    """
+    Simulation observer that visualizes fire progression with `plot_fire`.
+
+    Pass it to `simulate.simulate_fire` in `observers` to turn on plotting, which is off by default.
+
+    Parameters:
+    -----------
+    tree_types : np.ndarray
+        2D array representing the type of trees at each grid position.
+    every : int or None, optional
+        Plot the grid every `every` hours. None plots no hourly frames. Default is 1.
+    heatmap : bool, optional
+        Whether to plot the burn probabilities heatmap when the simulation ends. Default is True.
+
+    Example:
+    --------
+    >>> plotter = FirePlotter(np.array([['oak', 'oak']]), every=2)
+    >>> plotter(0, np.array([[2, 1]]), 0, np.zeros((1, 2)))  # Plots hour 0
+    >>> plotter(0, np.array([[4, 2]]), 1, np.zeros((1, 2)))  # Skipped
+    >>> plotter.close(np.array([[1.0, 1.0]]))
+    """
+
+    def __init__(self, tree_types, every=1, heatmap=True):
+        self.tree_types = encode_tree_types(tree_types, strict=False)  # Converted once for all frames
+        self.every = every
+        self.heatmap = heatmap
+
+    def __call__(self, simulation, grid, hours, cooldowns=None):
+        if self.every is not None and hours % self.every == 0:
+            plot_fire(grid, self.tree_types, hours)
+
+    def close(self, burn_probabilities):
+        if self.heatmap:
+            plot_burn_probabilities(burn_probabilities)
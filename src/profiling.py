@@ -0,0 +1,82 @@
+from time import perf_counter
+import pandas as pd
+
+# Phases of a simulated hour, in the order they run
+PHASES = ("termination", "spread", "environment", "observers")
+
+
+class HourTimer:
+    """Split the wall time of a simulated hour between its phases."""
+
+    def __init__(self):
+        self.start()
+
+    def start(self):
+        """Start timing a new hour."""
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.last = perf_counter()
+
+    def lap(self, phase):
+        """Charge the time since the previous lap to `phase`."""
+        now = perf_counter()
+        self.seconds[phase] += now - self.last
+        self.last = now
+
+
+class SimulationProfiler:
+    """
+    Record the wall time of each phase of every simulated hour, with the number of burning cells, ignition
+    attempts and ignitions. Pass it to `simulate.simulate_fire` as `profiler`.
+
+    The phases are the check for remaining fire ("termination"), the spread of the fire ("spread"), the
+    update of humidity, temperature and cooldowns ("environment") and the observers ("observers"). Without
+    a profiler, `simulate_fire` does none of this bookkeeping.
+
+    Parameters:
+    -----------
+    callback : callable, optional
+        Called with the record of every hour as a dict, as soon as the hour has been simulated.
+
+    Examples:
+    ---------
+    >>> import numpy as np
+    >>> from simulate import simulate_fire
+    >>> grid = np.array([[1, 2, 1], [0, 1, 0]])
+    >>> profiler = SimulationProfiler()
+    >>> burn_probabilities, results_df = simulate_fire(grid, np.where(grid == 1, "bush", None), 0, 'N',
+    ...                                                profiler=profiler)
+    >>> profile = profiler.to_frame()
+    >>> len(profile) == results_df.loc[0, "duration"]
+    True
+    >>> profile.columns.tolist()[:6]
+    ['simulation', 'hour', 'realizations', 'burning', 'attempts', 'ignitions']
+    >>> int(profile.loc[0, "attempts"])  # The fire tries to ignite its 3 neighbours
+    3
+    """
+
+    columns = ["simulation", "hour", "realizations", "burning", "attempts", "ignitions"] + \
+              [f"{phase}_seconds" for phase in PHASES]
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.records = []
+
+    def record(self, simulation, hour, seconds, burning, attempts, ignitions, realizations=1):
+        """
+        Record one simulated hour. For a stack of realizations advanced together, `simulation` is None and
+        the counts cover the `realizations` of the stack.
+        """
+        record = {"simulation": simulation, "hour": hour, "realizations": realizations, "burning": int(burning),
+                  "attempts": int(attempts), "ignitions": int(ignitions)}
+        record.update({f"{phase}_seconds": seconds[phase] for phase in PHASES})
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def to_frame(self):
+        """Return the records as a DataFrame, one row per simulated hour."""
+        return pd.DataFrame(self.records, columns=self.columns)
+
+    def summary(self):
+        """Return the total time spent in each phase, in seconds."""
+        return self.to_frame()[[f"{phase}_seconds" for phase in PHASES]].sum()
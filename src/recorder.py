@@ -0,0 +1,199 @@
+import zipfile
+import numpy as np
+
+
+class FrameRecorder:
+    """
+    Simulation observer that records the grid of every simulated hour to a compressed `.npz` archive.
+
+    Frames are stored as uint8 cell codes in a preallocated buffer of `capacity` frames, which is
+    written to the archive as one chunk whenever it is full and when the simulation ends. A recorded
+    run can then be loaded with `load_recording` or turned into an animation with `render_recording`
+    without rerunning the simulation.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the `.npz` archive to write. An existing file is overwritten.
+    capacity : int, optional
+        Number of frames buffered in memory before they are written. Default is 64.
+    record_cooldowns : bool, optional
+        Whether to also record the remaining cooldown of every cell. Default is False.
+
+    A recorder holds a single simulation run: once `close` has written the archive, recording more frames
+    or closing it again raises a ValueError. Use a new recorder, with its own path, for each run.
+
+    Example:
+    --------
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "run.npz")
+    >>> recorder = FrameRecorder(path, capacity=2)
+    >>> for hours in range(3):
+    ...     recorder(0, np.full((2, 2), hours), hours, np.zeros((2, 2)))
+    >>> recorder.close(np.ones((2, 2)))
+    >>> recording = load_recording(path)
+    >>> recording["frames"].shape, recording["hours"]
+    ((3, 2, 2), array([0, 1, 2], dtype=int32))
+    >>> recorder(0, np.zeros((2, 2)), 3, np.zeros((2, 2)))
+    Traceback (most recent call last):
+    ...
+    ValueError: FrameRecorder is closed, use a new recorder for each simulation run.
+    """
+
+    def __init__(self, path, capacity=64, record_cooldowns=False):
+        self.path = path
+        self.capacity = capacity
+        self.record_cooldowns = record_cooldowns
+        self.frames = None  # Allocated when the first frame arrives and the grid shape is known
+        self.cooldowns = None
+        self.simulations = np.zeros(capacity, dtype=np.int32)
+        self.hours = np.zeros(capacity, dtype=np.int32)
+        self.count = 0  # Number of buffered frames
+        self.chunks = 0  # Number of chunks already written
+        self.written = False  # Whether the archive has been created
+        self.closed = False  # Whether the run has ended and the archive is complete
+
+    def _check_open(self):
+        """Raise a ValueError if the recorder has already been closed."""
+        if self.closed:
+            raise ValueError("FrameRecorder is closed, use a new recorder for each simulation run.")
+
+    def __call__(self, simulation, grid, hours, cooldowns=None):
+        self._check_open()
+        if self.frames is None:
+            self.frames = np.zeros((self.capacity,) + grid.shape, dtype=np.uint8)
+            if self.record_cooldowns:
+                self.cooldowns = np.zeros((self.capacity,) + grid.shape, dtype=np.float32)
+
+        self.frames[self.count] = grid
+        if self.record_cooldowns:
+            self.cooldowns[self.count] = cooldowns
+        self.simulations[self.count] = simulation
+        self.hours[self.count] = hours
+        self.count += 1
+        if self.count == self.capacity:
+            self.flush()
+
+    def _write(self, arrays):
+        """Add arrays to the archive, creating it on the first write."""
+        with zipfile.ZipFile(self.path, "a" if self.written else "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, array in arrays.items():
+                with archive.open(f"{name}.npy", "w", force_zip64=True) as file:
+                    np.lib.format.write_array(file, np.ascontiguousarray(array))
+        self.written = True
+
+    def flush(self):
+        """Write the buffered frames to the archive as one chunk."""
+        if self.count == 0:
+            return
+        arrays = {
+            f"frames_{self.chunks:05d}": self.frames[:self.count],
+            f"simulations_{self.chunks:05d}": self.simulations[:self.count],
+            f"hours_{self.chunks:05d}": self.hours[:self.count],
+        }
+        if self.record_cooldowns:
+            arrays[f"cooldowns_{self.chunks:05d}"] = self.cooldowns[:self.count]
+        self._write(arrays)
+        self.chunks += 1
+        self.count = 0
+
+    def close(self, burn_probabilities=None):
+        """Write the remaining frames, and the burn probabilities of the simulation if given."""
+        self._check_open()
+        self.flush()
+        if burn_probabilities is not None:
+            self._write({"burn_probabilities": burn_probabilities})
+        self.closed = True
+
+
+def iter_recording(path):
+    """
+    Iterate over the chunks of a recording written by `FrameRecorder`, loading one chunk at a time.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the `.npz` archive.
+
+    Returns:
+    --------
+    iterator of dict
+        One dict per chunk with "frames", "simulations", "hours" and, if recorded, "cooldowns".
+    """
+    with np.load(path) as archive:
+        chunks = sorted(name.split("_")[1] for name in archive.files if name.startswith("frames_"))
+        for chunk in chunks:
+            yield {name: archive[f"{name}_{chunk}"]
+                   for name in ("frames", "simulations", "hours", "cooldowns") if f"{name}_{chunk}" in archive.files}
+
+
+def load_recording(path):
+    """
+    Load a whole recording written by `FrameRecorder`.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the `.npz` archive.
+
+    Returns:
+    --------
+    dict
+        "frames", "simulations", "hours" and, if recorded, "cooldowns" and "burn_probabilities".
+    """
+    chunks = list(iter_recording(path))
+    recording = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in (chunks[0] if chunks else {})}
+    with np.load(path) as archive:
+        if "burn_probabilities" in archive.files:
+            recording["burn_probabilities"] = archive["burn_probabilities"]
+    return recording
+
+
+def render_recording(path, output, tree_types, simulation=0, fps=5):
+    """
+    Render one simulation of a recording as an animation, with the colors used by `plot.plot_fire`. Raises a
+    ValueError if the recording holds no frames of that simulation.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the `.npz` archive written by `FrameRecorder`.
+    output : str
+        Path of the animation to write; a `.gif` is written with Pillow, other formats with ffmpeg.
+    tree_types : np.ndarray
+        2D array representing the type of trees at each grid position.
+    simulation : int, optional
+        Which simulation of the recording to render. Default is 0.
+    fps : int, optional
+        Frames per second of the animation. Default is 5.
+
+    Returns:
+    --------
+    None
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+    from plot import grid_to_rgb
+    from data import encode_tree_types
+
+    frames, hours = [], []
+    for chunk in iter_recording(path):
+        selected = chunk["simulations"] == simulation
+        frames.append(chunk["frames"][selected])
+        hours.append(chunk["hours"][selected])
+    if not sum(len(chunk_frames) for chunk_frames in frames):
+        raise ValueError(f"{path} has no recorded frames of simulation {simulation}.")
+    frames, hours = np.concatenate(frames), np.concatenate(hours)
+    tree_types = encode_tree_types(tree_types, strict=False)  # Converted once for all frames
+
+    fig, ax = plt.subplots()
+    image = ax.imshow(grid_to_rgb(frames[0], tree_types), interpolation='nearest')
+
+    def update(index):
+        image.set_data(grid_to_rgb(frames[index], tree_types))
+        ax.set_title(f"{hours[index]} hour(s) of Fire Spread")
+        return image,
+
+    animation = FuncAnimation(fig, update, frames=len(frames), blit=False)
+    animation.save(output, writer="pillow" if output.endswith(".gif") else "ffmpeg", fps=fps)
+    plt.close(fig)
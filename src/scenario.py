@@ -0,0 +1,150 @@
+import copy
+import numpy as np
+from data import species_flammability, species_burn_rates, encode_tree_types
+from environment import FireEnvironment
+
+# Hourly cooldown counter of a cell that never spreads
+NEVER = np.iinfo(np.uint16).max
+
+
+def wind_factors(wind_speed, wind_direction):
+    """
+    Compute the wind factor applied to each spread direction.
+
+    Parameters:
+    -----------
+    wind_speed : float
+        Wind speed in km/h.
+    wind_direction : str
+        Wind direction, one of 'N', 'S', 'E', 'W'.
+
+    Returns:
+    --------
+    list of float
+        Wind factors for spreading towards N, S, W and E.
+
+    Examples:
+    ---------
+    >>> wind_factors(0, 'N')
+    [1, 1, 1, 1]
+    >>> [round(w, 2) for w in wind_factors(10, 'E')]
+    [1, 1, 5.4, -4.4]
+    """
+    # Set wind speed and direction weights
+    if wind_speed < 1:
+        tailwind = 1
+        against_wind = 1
+    else:
+        tailwind = 0.49 * wind_speed + 0.5
+        against_wind = 1 - tailwind
+
+    # Wind effect factors for each direction
+    wind_weights = {
+        'N': [against_wind, tailwind, 1, 1],  # North
+        'E': [1, 1, tailwind, against_wind],  # East
+        'S': [tailwind, against_wind, 1, 1],  # South
+        'W': [1, 1, against_wind, tailwind],  # West
+    }
+    return wind_weights[wind_direction]  # Get wind effect based on direction
+
+
+class Scenario:
+    """
+    The parts of a fire simulation that do not change from hour to hour or between realizations.
+
+    A burning cell ignites a flammable neighbour with probability
+    `flammability * (1 - humidity) * (1 + (temperature - 25) / 100) * (1 + wind_factor / 5)`. Flammable
+    cells are never on fire, so their humidity only depends on water; everything but the temperature,
+    which is raised by nearby fire, is therefore computed once per direction and cell. The cooldown of a
+    newly ignited cell only depends on its tree type and the direction it was reached from.
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray
+        A 2D array representing the simulation grid.
+    tree_types : numpy.ndarray
+        A 2D array of tree type names, or of tree type ids from `data.encode_tree_types`.
+    wind_speed : float
+        Wind speed in km/h.
+    wind_direction : str
+        Wind direction, one of 'N', 'S', 'E', 'W'.
+    wind_affected : bool, optional
+        Whether the wind affects the burn rate. Default is True.
+    season : str, optional
+        Season can be 'summer', 'winter', or None.
+
+    Attributes:
+    -----------
+    tree_types : numpy.ndarray
+        Tree type ids of every cell.
+    wind_factors : list of float
+        Wind factors per direction, as returned by `wind_factors`.
+    wind_affected : bool
+        Whether the wind affects the burn rate.
+    environment : FireEnvironment
+        Humidity and temperature of `grid`, to be copied by every realization.
+    ignition : numpy.ndarray
+        (4, rows, cols) ignition probability of every cell when reached from each direction, at 25°C.
+    cooldowns : numpy.ndarray
+        (4, tree types) cooldown of a cell of each tree type when ignited from each direction.
+    cooldown_hours : numpy.ndarray
+        `cooldowns` rounded up to whole hours as uint16, the hourly counters of `simulate.SimulationState`.
+        Cooldowns of `NEVER` hours or more, such as infinite ones, are stored as `NEVER`.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[1, 2, 3]])
+    >>> scenario = Scenario(grid, np.array([["pine", None, None]], dtype=object), 0, 'N', season='summer')
+    >>> scenario.ignition[:, 0, 0].round(3)
+    array([0.71, 0.71, 0.71, 0.71])
+    >>> scenario.ignition_probability(0, np.array([0]), scenario.environment.temperatures).round(3)
+    array([0.796])
+    >>> scenario.cooldown(0, np.array([0])).round(3)
+    array([1.15])
+    """
+
+    def __init__(self, grid, tree_types, wind_speed, wind_direction, wind_affected=True, season=None):
+        self.tree_types = encode_tree_types(tree_types)
+        self.wind_factors = NZ = wind_factors(wind_speed, wind_direction)
+        self.wind_affected = wind_affected
+        self.environment = FireEnvironment(grid, season)  # Water-driven humidity is computed only once
+
+        flammability = species_flammability[self.tree_types]
+        dryness = flammability * (1 - self.environment.water_humidities)
+        self.ignition = np.stack([dryness * (1 + wind_factor / 5) for wind_factor in NZ])
+
+        # Adjust burn rate based on wind
+        burn_rates = np.stack([species_burn_rates * (1 + wind_factor) if wind_affected else species_burn_rates
+                               for wind_factor in NZ])
+        with np.errstate(divide='ignore'):
+            self.cooldowns = 1 / burn_rates
+        self.cooldown_hours = np.clip(np.ceil(self.cooldowns), 0, NEVER).astype(np.uint16)
+
+    def ignition_probability(self, direction, cells, temperatures):
+        """
+        Probability that each of `cells` (flat indices, possibly into a stack of grids) catches fire from a
+        burning neighbour in `direction`, given the current `temperatures`.
+        """
+        return self.cell_ignition_probability(direction, cells, temperatures.flat[cells])
+
+    def cell_ignition_probability(self, direction, cells, cell_temperatures):
+        """As `ignition_probability`, given the temperature of each of `cells` rather than of the whole grid."""
+        return self.ignition[direction].flat[cells % self.tree_types.size] * (1 + (cell_temperatures - 25) / 100)
+
+    def cooldown(self, direction, cells):
+        """Cooldown of each of `cells` (flat indices, possibly into a stack of grids) when ignited from `direction`."""
+        return self.cooldowns[direction, self.tree_types.flat[cells % self.tree_types.size]]
+
+    def ignite(self, grid, cells):
+        """
+        Set fire to flat `cells` of `grid`, the grid this scenario was built from.
+
+        Returns a copy of `grid` with the new fires, and a copy of the scenario that shares its tables but
+        whose environment accounts for the new fires. Many ignition points can thus reuse one scenario.
+        """
+        grid = grid.copy()
+        grid.flat[cells] = 2
+        scenario = copy.copy(self)
+        scenario.environment = self.environment.copy()
+        scenario.environment.update(np.asarray(cells, dtype=np.intp), np.zeros(0, dtype=np.intp))
+        return grid, scenario
@@ -1,8 +1,64 @@
 import numpy as np
+from data import tree_species, decode_tree_types
+
+# Share of the frontier of a growing patch that joins it in each round
+GROWTH_RATE = 0.5
+
+
+def _neighbours(cells, rows, cols):
+    """Flat indices of the N, S, W and E neighbours of flat `cells` that lie inside a rows x cols grid."""
+    c = cells % cols
+    north, south = cells - cols, cells + cols
+    return np.concatenate([north[north >= 0], south[south < rows * cols],
+                           (cells - 1)[c > 0], (cells + 1)[c < cols - 1]])
+
+
+def _random_cell(available, rng):
+    """Pick a random available flat cell, or None if there is none."""
+    cell = rng.integers(available.size)
+    if not available[cell]:
+        candidates = np.flatnonzero(available)
+        if candidates.size == 0:
+            return None
+        cell = rng.choice(candidates)
+    return cell
+
+
+def _grow_patch(available, start, size, shape, rng):
+    """
+    Grow a connected patch of up to `size` cells from flat cell `start` and return its flat indices.
+
+    In every round a random share of the cells bordering the patch joins it, so the cost of a round is
+    proportional to the patch perimeter. Cells taken by the patch are cleared in `available`, and growth
+    stops early when no available cell borders the patch.
+    """
+    rows, cols = shape
+    available[start] = False
+    patch = [np.array([start])]
+    grown = 1
+    frontier = _neighbours(patch[0], rows, cols)
+
+    while grown < size:
+        frontier = np.unique(frontier[available[frontier]])  # Drop cells taken since they were added
+        if frontier.size == 0:
+            break  # Boxed in
+
+        chosen = frontier[rng.random(frontier.size) < GROWTH_RATE]
+        if chosen.size == 0:
+            chosen = frontier[[rng.integers(frontier.size)]]
+        elif chosen.size > size - grown:
+            chosen = rng.choice(chosen, size - grown, replace=False)
+
+        available[chosen] = False
+        patch.append(chosen)
+        grown += chosen.size
+        frontier = np.concatenate([frontier, _neighbours(chosen, rows, cols)])
+
+    return np.concatenate(patch)
 
 
 def initialize_grid(rows, cols, water_body_ratio=0.1, fire_location=(25, 25), num_water_bodies=10, bush_ratio=0.05,
-                    nums_of_busharea=4):
+                    nums_of_busharea=4, rng=None, tree_type_ids=False):
     """
         Initializes a grid representing a forest ecosystem with various elements like trees, bushes,
         water bodies, and a fire starting point. The grid is populated based on the specified parameters.
@@ -23,6 +79,12 @@ def initialize_grid(rows, cols, water_body_ratio=0.1, fire_location=(25, 25), nu
             The proportion of tree cells that will be converted into bushes. Default is 0.05 (5% of trees).
         nums_of_busharea : int, optional
             The number of separate bush areas to create. Default is 4.
+        rng : numpy.random.Generator or int, optional
+            Generator or seed for the random draws. By default a generator is seeded from the global
+            `np.random` state, so `np.random.seed` still makes the grid reproducible.
+        tree_type_ids : bool, optional
+            Return tree types as uint8 ids from `data.encode_tree_types` instead of names, which takes
+            8 times less memory on large grids. Default is False.
 
         Returns:
         --------
@@ -38,6 +100,8 @@ def initialize_grid(rows, cols, water_body_ratio=0.1, fire_location=(25, 25), nu
             - "pine", "oak", or "willow" for tree cells
             - "bush" for bush cells
             - None for non-tree/non-bush cells
+            Water bodies and bush areas stop growing early if they are boxed in, so they can be smaller
+            than requested.
 
         Examples:
         ---------
@@ -52,71 +116,47 @@ def initialize_grid(rows, cols, water_body_ratio=0.1, fire_location=(25, 25), nu
         True
         >>> tree_types.shape == grid.shape
         True
+        >>> grid, tree_types = initialize_grid(10, 10, water_body_ratio=0.5, fire_location=(5, 5), rng=3,
+        ...                                    tree_type_ids=True)
+        >>> grid[5, 5] == 2  # Water never covers the fire start location
+        True
+        >>> tree_types.dtype
+        dtype('uint8')
     """
+    rng = np.random.default_rng(np.random.randint(2 ** 32) if rng is None else rng)
+
     # Initialize grid: 0 = empty, 1 = tree
-    grid = np.random.choice([0, 1], size=(rows, cols), p=[0.15, 0.85])  # 15% empty, 85% plants
+    grid = (rng.random((rows, cols)) >= 0.15).astype(int)  # 15% empty, 85% plants
     grid[fire_location] = 2  # Fire start location
 
     # Calculate total water cells and assign water areas
     total_water_cells = int(rows * cols * water_body_ratio)
     water_cells_per_body = total_water_cells // num_water_bodies
-    all_water_cells = set()
+    available = grid.ravel() != 2  # Water bodies do not overlap each other or the fire start location
 
     for _ in range(num_water_bodies):
-        water_center = (np.random.randint(0, rows), np.random.randint(0, cols))
-        water_cells = {water_center}
-
-        while len(water_cells) < water_cells_per_body:
-            current_cell = list(water_cells)[np.random.randint(0, len(water_cells))]
-            neighbors = [
-                (current_cell[0] + dx, current_cell[1] + dy)
-                for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]
-                if 0 <= current_cell[0] + dx < rows and 0 <= current_cell[1] + dy < cols
-                   and (current_cell[0] + dx, current_cell[1] + dy) not in all_water_cells
-            ]
-            if neighbors:
-                new_cell = neighbors[np.random.randint(0, len(neighbors))]
-                water_cells.add(new_cell)
-
-        all_water_cells.update(water_cells)
-
-    for i, j in all_water_cells:
-        grid[i, j] = 3  # Mark water cells
+        water_center = _random_cell(available, rng)
+        if water_center is None:
+            break
+        grid.flat[_grow_patch(available, water_center, water_cells_per_body, grid.shape, rng)] = 3  # Mark water cells
 
     # Assign bushes to specific areas
     total_trees = np.sum(grid == 1)
     total_bushes = int(total_trees * bush_ratio)
     bushes_per_area = total_bushes // nums_of_busharea
-    all_bush_cells = set()
+    available = grid.ravel() == 1  # Only trees become bushes
 
     for _ in range(nums_of_busharea):
-        bush_center = (np.random.randint(0, rows), np.random.randint(0, cols))
-        while grid[bush_center] != 1:  # Ensure bush center is a tree
-            bush_center = (np.random.randint(0, rows), np.random.randint(0, cols))
-
-        bush_cells = {bush_center}
-
-        while len(bush_cells) < bushes_per_area:
-            current_cell = list(bush_cells)[np.random.randint(0, len(bush_cells))]
-            neighbors = [
-                (current_cell[0] + dx, current_cell[1] + dy)
-                for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]
-                if 0 <= current_cell[0] + dx < rows and 0 <= current_cell[1] + dy < cols
-                   and (current_cell[0] + dx, current_cell[1] + dy) not in all_bush_cells
-                   and grid[current_cell[0] + dx, current_cell[1] + dy] == 1  # Only trees become bushes
-            ]
-            if neighbors:
-                new_cell = neighbors[np.random.randint(0, len(neighbors))]
-                bush_cells.add(new_cell)
-
-        all_bush_cells.update(bush_cells)
-
-    for i, j in all_bush_cells:
-        grid[i, j] = 5  # Mark bush cells
+        bush_center = _random_cell(available, rng)
+        if bush_center is None:
+            break
+        grid.flat[_grow_patch(available, bush_center, bushes_per_area, grid.shape, rng)] = 5  # Mark bush cells
 
     # Tree types: assign types to trees and bushes
-    tree_types = np.empty_like(grid, dtype=object)
-    tree_types[grid == 1] = np.random.choice(["pine", "oak", "willow"], size=np.sum(grid == 1))
-    tree_types[grid == 5] = "bush"  # Assign bushes explicitly
+    tree_types = np.zeros(grid.shape, dtype=np.uint8)
+    is_tree = grid == 1
+    tree_types[is_tree] = rng.choice([tree_species.index(name) for name in ("pine", "oak", "willow")],
+                                     size=np.sum(is_tree))
+    tree_types[grid == 5] = tree_species.index("bush")  # Assign bushes explicitly
 
-    return grid, tree_types
+    return grid, tree_types if tree_type_ids else decode_tree_types(tree_types)
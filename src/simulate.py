@@ -1,10 +1,15 @@
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from heapq import heappush, heappop
+from statistics import NormalDist
 import numpy as np
-from data import tree_flammability
-from data import tree_burn_rates
-from plot import plot_fire
+from data import species_flammability, species_burn_rates
 import pandas as pd
-
+from environment import FireEnvironment, FIRE_OFFSETS, neighbourhood_sum
+import kernels
+from profiling import HourTimer
+from scenario import Scenario, wind_factors, NEVER
 
 def calculate_humidity_and_temperature(grid, season=None):
     """
@@ -49,55 +54,925 @@ def calculate_humidity_and_temperature(grid, season=None):
            [10, 15, 17],
            [10, 15, 17]])
     """
+    environment = FireEnvironment(grid, season)
+    humidities, temperatures = environment.humidities, environment.temperatures
+
+    return humidities, temperatures  # Return both the humidity and temperature grids
+
+
+# Neighbour offsets in the order used for wind weights: N, S, W, E
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# Order in which the sources of a target cell are visited by the row-major sweep
+# (above, left, right, below), expressed as indices into DIRECTIONS
+SWEEP_ORDER = [1, 3, 2, 0]
+_DIRECTION_TABLE = np.array(DIRECTIONS)  # For `kernels.spread_targets`
+
+ENGINES = ("loop", "numpy", "frontier", "event")
+
+
+def spread_step_loop(grid, cooldowns, tree_types, humidities, temperatures, NZ, wind_affected=True, rng=np.random):
+    """
+    Advance the fire by one hour, visiting every cell of the grid in turn.
+
+    `tree_types` holds tree type ids from `data.encode_tree_types`.
+
+    `cooldowns` is updated in place for the cells that ignite or burn out; the caller is
+    responsible for decrementing it at the end of the hour.
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        - new_grid: The grid after this hour.
+        - burned: A boolean mask of the cells that burned out this hour.
+    """
     rows, cols = grid.shape
+    new_grid = grid.copy()
+    burned = np.zeros(grid.shape, dtype=bool)
 
-    if season == 'summer':
-        humidities = np.full((rows, cols), 0.1)
-        temperatures = np.full((rows, cols), 30)
-    elif season == 'winter':
-        humidities = np.full((rows, cols), 0.4)
-        temperatures = np.full((rows, cols), 12)
-    else:
-        humidities = np.full((rows, cols), 0.2)
-        temperatures = np.full((rows, cols), 24)  # Initialize temperature grid with 25°C
-
-    # Update humidity based on proximity to water (grid value 3)
-    for i in range(rows):
-        for j in range(cols):
-            if grid[i, j] == 3:  # Water cell
-                humidities[i, j] = 0.8  # Set humidity to 0.8 for water cells
-                for x in range(rows):
-                    for y in range(cols):
-                        if grid[x, y] == 3:
-                            continue  # Skip other water cells
-                        distance = abs(i - x) + abs(j - y)  # Calculate Manhattan distance
-                        # Only affect cells within 4 distance of water cells, and avoid fire cells
-                        if distance <= 4 and grid[x, y] != 2 and humidities[x, y] < 1:  # Exclude fire cells
-                            humidities[x, y] += 0.8 / (distance + 3)  # Decay humidity with distance
-                            if humidities[x, y] >= 0.85:
-                                humidities[x, y] = 0.85
-
-    # Update temperature based on proximity to fire (grid value 2)
-    for i in range(rows):
-        for j in range(cols):
-            if grid[i, j] == 2:  # Fire cell
-                for x in range(max(0, i - 1), min(rows, i + 2)):  # Check 3x3 area around fire
-                    for y in range(max(0, j - 1), min(cols, j + 2)):
-                        temperatures[x, y] = min(100,
-                                                 temperatures[x, y] + 5)  # Increase temperature by 5, capped at 100°C
-
-    # Adjust temperature based on humidity (e.g., cooler near water, warmer near fire)
-    for i in range(rows):
-        for j in range(cols):
-            if humidities[i, j] > 0.7:  # Near water
-                temperatures[i, j] = max(temperatures[i, j] - 2, 0)  # Reduce temperature if near water
-            elif humidities[i, j] < 0.3:  # Dry areas (near fire)
-                temperatures[i, j] = min(temperatures[i, j] + 2, 100)  # Increase temperature in dry areas
+    # Iterate over grid cells to simulate fire spread
+    for r in range(rows):
+        for c in range(cols):
+            if grid[r, c] == 2 and cooldowns[r, c] <= 0:  # Burning cell
+                # Spread fire to neighboring cells (N, S, W, E)
+                for i, (dr, dc) in enumerate(DIRECTIONS):
+                    nr, nc = r + dr, c + dc
+                    if 0 <= nr < rows and 0 <= nc < cols and (grid[nr, nc] == 1 or grid[nr, nc] == 5):
+                        tree_type = tree_types[nr, nc]  # Get tree type id
+                        flammability = species_flammability[tree_type]  # Get flammability rate
+                        burn_rate = species_burn_rates[tree_type]  # Get burn rate
+
+                        wind_factor = NZ[i]  # Get wind factor for this direction
+
+                        # Adjust burn rate based on wind and conditions
+                        adjusted_burn_rate = burn_rate * (1 + wind_factor) if wind_affected else burn_rate
+                        burn_probability = flammability * (1 - humidities[nr, nc]) * (
+                                1 + (temperatures[nr, nc] - 25) / 100) * (
+                                                   1 + wind_factor / 5)
+
+                        # Ignite neighboring cell based on probability
+                        if rng.random() < burn_probability:
+                            new_grid[nr, nc] = 2  # Ignite cell
+                            cooldowns[nr, nc] = 1 / adjusted_burn_rate
+
+                # Mark current cell as burned out
+                new_grid[r, c] = 4
+                burned[r, c] = True
+                cooldowns[r, c] = 0
+
+    return new_grid, burned
+
+
+def _shifted(array, dr, dc, fill):
+    """Return `array` moved by (dr, dc), so that result[r, c] == array[r - dr, c - dc]."""
+    rows, cols = array.shape[-2:]
+    result = np.full_like(array, fill)
+    result[..., max(dr, 0):rows + min(dr, 0), max(dc, 0):cols + min(dc, 0)] = \
+        array[..., max(-dr, 0):rows + min(-dr, 0), max(-dc, 0):cols + min(-dc, 0)]
+    return result
+
+
+def _uniform(rng, cells, plane_size):
+    """Draw one uniform number per cell, from the generator of each cell's realization if `rng` is a list."""
+    if not isinstance(rng, list):
+        return rng.random(cells.size)
+    counts = np.bincount(cells // plane_size, minlength=len(rng))  # Cells are sorted, so grouped by realization
+    return np.concatenate([generator.random(count) for generator, count in zip(rng, counts)])
+
+
+def spread_step_numpy(grid, cooldowns, environment, scenario, rng=np.random):
+    """
+    Advance the fire by one hour using whole-array operations.
+
+    Follows the same rules as `spread_step_loop`: a burning cell whose cooldown has expired
+    tries to ignite each flammable neighbour (codes 1 and 5) and then burns out (code 4).
+    When a cell is ignited by several neighbours in the same hour, the cooldown of the
+    neighbour that comes last in row-major order is kept, as in the cell-by-cell sweep.
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray
+        The grid at the start of the hour, or a stack of grids (one per realization) along the first axis.
+    cooldowns : numpy.ndarray
+        Remaining cooldown of each cell, updated in place.
+    environment : FireEnvironment
+        Humidity and temperature of `grid` for this hour.
+    scenario : Scenario
+        Precomputed ignition probabilities and cooldowns; shared by all grids of a stack.
+    rng : numpy.random.Generator or module, or list of numpy.random.Generator, optional
+        Source of the random draws. Defaults to the global `np.random` state. For a stack of grids, a
+        list with one generator per grid makes every realization draw from its own generator, exactly as
+        if it were run on its own.
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        - new_grid: The grid after this hour.
+        - burned: A boolean mask of the cells that burned out this hour.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[1, 2, 1], [0, 1, 0]])
+    >>> scenario = Scenario(grid, np.where(grid == 1, "bush", None), 0, 'N')
+    >>> scenario.ignition[:] = 2.0  # High enough to always ignite
+    >>> cooldowns = np.zeros(grid.shape)
+    >>> new_grid, burned = spread_step_numpy(grid, cooldowns, scenario.environment, scenario)
+    >>> new_grid
+    array([[2, 4, 2],
+           [0, 2, 0]])
+    >>> cooldowns
+    array([[0.5, 0. , 0.5],
+           [0. , 0.5, 0. ]])
+    """
+    active = (grid == 2) & (cooldowns <= 0)
+    flammable = (grid == 1) | (grid == 5)
+    new_grid = grid.copy()
+    plane_size = scenario.tree_types.size
+
+    for i in SWEEP_ORDER:
+        dr, dc = DIRECTIONS[i]
+        candidates = np.flatnonzero(_shifted(active, dr, dc, False) & flammable)
+        if candidates.size == 0:
+            continue
+
+        burn_probability = scenario.ignition_probability(i, candidates, environment.temperatures)
+        ignited = candidates[_uniform(rng, candidates, plane_size) < burn_probability]
+
+        new_grid.flat[ignited] = 2
+        cooldowns.flat[ignited] = scenario.cooldown(i, ignited)
+
+    # Mark spreading cells as burned out
+    new_grid[active] = 4
+    cooldowns[active] = 0
+    return new_grid, active
 
-    return humidities, temperatures  # Return both the humidity and temperature grids
 
+def _ignition_attempts(grid, cells, direction, cols):
+    """Return the cells reached from `cells` in `direction` that are inside the grid and flammable."""
+    rows = grid.shape[0]
+    dr, dc = DIRECTIONS[direction]
+    r, c = np.divmod(cells, cols)
+    nr, nc = r + dr, c + dc
+    targets = (nr * cols + nc)[(nr >= 0) & (nr < rows) & (nc >= 0) & (nc < cols)]
+    codes = grid.flat[targets]
+    return targets[(codes == 1) | (codes == 5)]
 
-def simulate_fire(grid, tree_types, wind_speed, wind_direction, simulations=1, wind_affected=True, season=None):
+
+def _count_attempts(grid, active):
+    """Number of ignition draws made from the `active` cells of `grid` (or of a stack of grids) in an hour."""
+    flammable = (grid == 1) | (grid == 5)
+    return sum(np.count_nonzero(_shifted(active, dr, dc, False) & flammable) for dr, dc in DIRECTIONS)
+
+
+def run_frontier(grid, environment, scenario, rng=np.random, on_hour=None, profile=None):
+    """
+    Run one realization, visiting only the burning cells and their neighbours each hour.
+
+    The set of burning cells is kept as a sorted array of flat indices, so the cost of an hour is
+    proportional to the fire front rather than to the size of the grid. The rules, and the order in
+    which random numbers are drawn, are the same as in `spread_step_numpy`.
+
+    Cells with an infinite cooldown never spread. As in `run_events`, they are left burning and the run
+    ends once they are the only burning cells.
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray
+        The grid at the start of the simulation; updated in place.
+    environment : FireEnvironment
+        Humidity and temperature of `grid`; updated in place.
+    scenario : Scenario
+        Precomputed ignition probabilities and cooldowns.
+    rng : numpy.random.Generator or module, optional
+        Source of the random draws. Defaults to the global `np.random` state.
+    on_hour : callable, optional
+        Called as `on_hour(grid, hours, cooldowns)` at the end of every hour.
+    profile : callable, optional
+        Called as `profile(hours, seconds, burning, attempts, ignitions)` at the end of every hour, with the
+        time spent in each phase, e.g. the `record` method of a `profiling.SimulationProfiler`.
+
+    Returns:
+    --------
+    tuple
+        - numpy.ndarray: Flat indices of the cells that burned.
+        - int: Duration of the fire in hours.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[1, 2, 1], [0, 1, 0]])
+    >>> scenario = Scenario(grid, np.where(grid == 1, "bush", None), 0, 'N')
+    >>> scenario.ignition[:] = 2.0  # High enough to always ignite
+    >>> burned, hours = run_frontier(grid, scenario.environment.copy(), scenario)
+    >>> burned, hours
+    (array([1, 0, 2, 4]), 2)
+    >>> grid
+    array([[4, 4, 4],
+           [0, 4, 0]])
+
+    A headwind that cancels the burn rate of the bush west of the fire leaves it burning forever:
+
+    >>> grid = np.array([[5, 2, 5, 5]])
+    >>> scenario = Scenario(grid, np.where(grid == 5, "bush", None), 1.5 / 0.49, 'W')
+    >>> scenario.ignition[:] = 2.0
+    >>> run_frontier(grid, scenario.environment.copy(), scenario)
+    (array([1, 2, 3]), 3)
+    >>> grid
+    array([[2, 4, 4, 4]])
+    """
+    cols = grid.shape[1]
+    cooldowns = np.zeros(grid.size)
+    burning = np.flatnonzero(grid == 2)
+    burned = []
+    hours = 0
+    timer = None if profile is None else HourTimer()
+
+    # Terminate simulation if no fire that can still spread is left
+    while burning.size and not np.isposinf(cooldowns[burning]).all():
+        if timer is not None:
+            timer.lap("termination")
+        active = burning[cooldowns[burning] <= 0]
+
+        ignited = []
+        attempts = 0
+        for i in SWEEP_ORDER:
+            candidates = _ignition_attempts(grid, active, i, cols)
+            attempts += candidates.size
+            if candidates.size == 0:
+                continue
+
+            burn_probability = scenario.ignition_probability(i, candidates, environment.temperatures)
+            cells = candidates[rng.random(candidates.size) < burn_probability]
+            cooldowns[cells] = scenario.cooldown(i, cells)
+            ignited.append(cells)
+
+        ignited = np.unique(np.concatenate(ignited)) if ignited else active[:0]
+        grid.flat[ignited] = 2
+        grid.flat[active] = 4  # Mark spreading cells as burned out
+        cooldowns[active] = 0
+        burned.append(active)
+        if timer is not None:
+            timer.lap("spread")
+
+        environment.update(ignited, active)
+        was_burning = burning.size
+        burning = np.union1d(np.setdiff1d(burning, active, assume_unique=True), ignited)
+        cooldowns[burning] = np.maximum(0, cooldowns[burning] - 1)
+        if timer is not None:
+            timer.lap("environment")
+        if on_hour is not None:
+            on_hour(grid, hours, cooldowns.reshape(grid.shape))
+        if timer is not None:
+            timer.lap("observers")
+            profile(hours, timer.seconds, was_burning, attempts, ignited.size)
+            timer.start()
+        hours += 1
+
+    return np.concatenate(burned) if burned else np.zeros(0, dtype=np.intp), hours
+
+
+def run_events(grid, environment, scenario, rng=np.random, on_hour=None, profile=None):
+    """
+    Run one realization as a sequence of events, jumping straight from one hour in which fire spreads to
+    the next.
+
+    A cell ignited in hour h with cooldown c spreads in hour h + max(1, ceil(c)), the first hour its
+    decremented cooldown has run out. Each ignition is scheduled for that hour in a priority queue, so
+    hours in which burning cells only cool down cost nothing, and the whole run costs time proportional
+    to the number of ignitions. Within an hour the rules, and the order in which random numbers are drawn,
+    are those of `run_frontier`, so both engines give the same fire for the same `rng`.
+
+    Cells with an infinite cooldown never spread and are left burning.
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray
+        The grid at the start of the simulation; updated in place.
+    environment : FireEnvironment
+        Humidity and temperature of `grid`; updated in place.
+    scenario : Scenario
+        Precomputed ignition probabilities and cooldowns.
+    rng : numpy.random.Generator or module, optional
+        Source of the random draws. Defaults to the global `np.random` state.
+    on_hour : callable, optional
+        Called as `on_hour(grid, hours, cooldowns)` at the end of every hour, including the hours that are
+        jumped over.
+    profile : callable, optional
+        Called as `profile(hours, seconds, burning, attempts, ignitions)` at the end of every hour in which
+        fire spreads; the hours that are jumped over take no time and are not recorded.
+
+    Returns:
+    --------
+    tuple
+        - numpy.ndarray: Flat indices of the cells that burned.
+        - int: Duration of the fire in hours.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[1, 2, 1], [0, 1, 0]])
+    >>> scenario = Scenario(grid, np.where(grid == 1, "willow", None), 0, 'N')
+    >>> scenario.ignition[:] = 2.0  # High enough to always ignite
+    >>> burned, hours = run_events(grid, scenario.environment.copy(), scenario)
+    >>> burned, hours  # The willows burn for 3 hours after they ignite
+    (array([1, 0, 2, 4]), 4)
+    >>> run_frontier(np.array([[1, 2, 1], [0, 1, 0]]), scenario.environment.copy(), scenario)[1]
+    4
+    """
+    cols = grid.shape[1]
+    pending = {0: [np.flatnonzero(grid == 2)]}  # Cells that spread in each scheduled hour
+    queue = [0] if pending[0][0].size else []
+    burning = pending[0][0].size
+    burned = []
+    hours = 0
+    timer = None if profile is None else HourTimer()
+    if on_hour is not None:
+        # Cooldown of every cell when it ignited, and the hour it ignited in, to report cooldowns by the hour
+        initial_cooldowns = np.zeros(grid.size)
+        ignition_hours = np.full(grid.size, -1)
+
+    while queue:
+        hour = heappop(queue)
+        if on_hour is not None:
+            for idle_hour in range(hours, hour):
+                on_hour(grid, idle_hour, _event_cooldowns(grid, idle_hour, initial_cooldowns, ignition_hours))
+        if timer is not None:
+            timer.start()
+        active = np.sort(np.concatenate(pending.pop(hour)))
+
+        cells, cooldowns = [], []
+        attempts = 0
+        for i in SWEEP_ORDER:
+            candidates = _ignition_attempts(grid, active, i, cols)
+            attempts += candidates.size
+            if candidates.size == 0:
+                continue
+
+            burn_probability = scenario.ignition_probability(i, candidates, environment.temperatures)
+            ignited = candidates[rng.random(candidates.size) < burn_probability]
+            cells.append(ignited)
+            cooldowns.append(scenario.cooldown(i, ignited))
+
+        # A cell ignited from several directions keeps the cooldown of the last one, as in `run_frontier`
+        cells = np.concatenate(cells) if cells else active[:0]
+        ignited, last = np.unique(cells[::-1], return_index=True)
+        cooldowns = np.concatenate(cooldowns)[::-1][last] if ignited.size else np.zeros(0)
+        grid.flat[ignited] = 2
+        grid.flat[active] = 4  # Mark spreading cells as burned out
+        burned.append(active)
+        if timer is not None:
+            timer.lap("spread")
+
+        environment.update(ignited, active)
+        with np.errstate(invalid="ignore"):
+            due = hour + np.maximum(1, np.ceil(cooldowns))
+        for due_hour in np.unique(due[np.isfinite(due)]).astype(int):
+            if due_hour not in pending:
+                heappush(queue, due_hour)
+                pending[due_hour] = []
+            pending[due_hour].append(ignited[due == due_hour])
+        if on_hour is not None:
+            initial_cooldowns[ignited] = cooldowns
+            ignition_hours[ignited] = hour
+            initial_cooldowns[active] = 0
+        if timer is not None:
+            timer.lap("environment")
+        if on_hour is not None:
+            on_hour(grid, hour, _event_cooldowns(grid, hour, initial_cooldowns, ignition_hours))
+        if timer is not None:
+            timer.lap("observers")
+            profile(hour, timer.seconds, burning, attempts, ignited.size)
+        burning += ignited.size - active.size
+        hours = hour + 1
+
+    return np.concatenate(burned) if burned else np.zeros(0, dtype=np.intp), hours
+
+
+def _event_cooldowns(grid, hour, initial_cooldowns, ignition_hours):
+    """Cooldowns at the end of `hour` of a run of `run_events`, as the hourly engines would report them."""
+    remaining = np.maximum(0, initial_cooldowns - (hour + 1 - ignition_hours))
+    return np.where(grid.ravel() == 2, remaining, 0).reshape(grid.shape)
+
+
+def _run_hourly(grid, environment, step, on_hour=None, profile=None):
+    """
+    Run one realization by applying `step(grid, cooldowns, environment)` to the whole grid every hour.
+    Returns the flat indices of the cells that burned and the duration in hours.
+
+    Cells with an infinite cooldown never spread; the run ends once they are the only burning cells, which
+    are left burning, as in `run_events`.
+    """
+    cooldowns = np.zeros_like(grid, dtype=float)  # Initialize cooldown grid
+    burned = []
+    hours = 0
+    timer = None if profile is None else HourTimer()
+
+    while True:
+        # Terminate simulation if no fire that can still spread is left
+        burning = grid == 2
+        if not (burning & ~np.isposinf(cooldowns)).any():
+            break
+        burning = np.count_nonzero(burning)
+        if timer is not None:
+            timer.lap("termination")
+
+        # Spread fire from burning cells to their neighbours, using humidity and temperature based on the
+        # season, water and the current fire front
+        new_grid, burned_now = step(grid, cooldowns, environment)
+        burned.append(np.flatnonzero(burned_now))
+        if timer is not None:
+            timer.lap("spread")
+
+        # Update environment, cooldowns and grid
+        ignited = np.flatnonzero((new_grid == 2) & (grid != 2))
+        environment.update(ignited, burned[-1])
+        cooldowns = np.maximum(0, cooldowns - 1)
+        if timer is not None:
+            timer.lap("environment")
+        if on_hour is not None:
+            on_hour(new_grid, hours, cooldowns)
+        if timer is not None:
+            timer.lap("observers")
+            profile(hours, timer.seconds, burning, _count_attempts(grid, burned_now), ignited.size)
+            timer.start()
+        grid = new_grid
+        hours += 1
+
+    return np.concatenate(burned) if burned else np.zeros(0, dtype=np.intp), hours
+
+
+def run_batch(grids, environment, step, on_hour=None, rngs=None, profile=None):
+    """
+    Run a stack of independent realizations together, applying `step` to the whole stack every hour.
+
+    Realizations whose fire has died out are dropped from the stack, so the remaining ones keep
+    being advanced without carrying finished grids along. Cells with an infinite cooldown never spread, so a
+    realization whose only burning cells have one is dropped too, and they are left burning.
+
+    Parameters:
+    -----------
+    grids : numpy.ndarray
+        A (realizations, rows, cols) stack of grids at the start of the simulation.
+    environment : FireEnvironment
+        Humidity and temperature of the stack.
+    step : callable
+        Called as `step(grids, cooldowns, environment)`, e.g. `spread_step_numpy` with a fixed `scenario`.
+    on_hour : callable, optional
+        Called as `on_hour(realization, grid, hours, cooldowns)` at the end of every hour of every running
+        realization.
+    rngs : list of numpy.random.Generator, optional
+        One generator per realization, passed to `step` as `rng`. By default `step` uses its own.
+    profile : callable, optional
+        Called as `profile(hours, seconds, burning, attempts, ignitions, realizations)` at the end of every
+        hour, with counts summed over the `realizations` still running.
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        - burn_counts: Number of realizations in which each cell burned.
+        - burned_area: Number of burned cells in each realization.
+        - duration: Duration of the fire in hours for each realization.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[1, 2, 1], [0, 1, 0]])
+    >>> scenario = Scenario(grid, np.where(grid == 1, "bush", None), 0, 'N')
+    >>> scenario.ignition[:] = 2.0  # High enough to always ignite
+    >>> grids = np.stack([grid, np.zeros_like(grid)])
+    >>> run_batch(grids, FireEnvironment(grids), partial(spread_step_numpy, scenario=scenario))
+    (array([[1, 1, 1],
+           [0, 1, 0]]), array([4, 0]), array([2, 0]))
+    """
+    realizations, rows, cols = grids.shape
+    burn_counts = np.zeros((rows, cols), dtype=int)
+    burned_area = np.zeros(realizations, dtype=int)
+    duration = np.zeros(realizations, dtype=int)
+
+    running = np.arange(realizations)  # Realization of every grid still in the stack
+    cooldowns = np.zeros(grids.shape)
+    hours = 0
+    timer = None if profile is None else HourTimer()
+    while True:
+        # Retire realizations with no fire left that can spread
+        burning = ((grids == 2) & ~np.isposinf(cooldowns)).any(axis=(1, 2))
+        if not burning.all():
+            running, grids, cooldowns = running[burning], grids[burning], cooldowns[burning]
+            environment = environment.take(burning)
+        if running.size == 0:
+            break
+        if timer is not None:
+            timer.lap("termination")
+
+        random = {} if rngs is None else {"rng": [rngs[realization] for realization in running]}
+        new_grids, burned = step(grids, cooldowns, environment, **random)
+        burn_counts += burned.sum(axis=0)
+        burned_area[running] += burned.sum(axis=(1, 2))
+        if timer is not None:
+            timer.lap("spread")
+
+        # Update environment, cooldowns and grids
+        ignited = np.flatnonzero((new_grids == 2) & (grids != 2))
+        environment.update(ignited, np.flatnonzero(burned))
+        cooldowns = np.maximum(0, cooldowns - 1)
+        if timer is not None:
+            timer.lap("environment")
+        if on_hour is not None:
+            for realization, grid, grid_cooldowns in zip(running, new_grids, cooldowns):
+                on_hour(realization, grid, duration[realization], grid_cooldowns)
+        if timer is not None:
+            timer.lap("observers")
+            profile(hours, timer.seconds, np.sum(grids == 2), _count_attempts(grids, burned), ignited.size,
+                    running.size)
+            timer.start()
+        grids = new_grids
+        duration[running] += 1
+        hours += 1
+
+    return burn_counts, burned_area, duration
+
+
+class SimulationState:
+    """
+    The changing state of a stack of realizations, held in compact buffers that are allocated once and
+    updated in place every hour.
+
+    Cell codes are uint8 and double-buffered: an hour reads the grids of one buffer and writes the next
+    grids to the other, then the two are swapped. Cooldowns are kept as uint16 counters of the hours left
+    before a cell spreads, `Scenario.cooldown_hours`: a cooldown c runs out after ceil(c) hours, so the
+    counters make the same cells spread in the same hours as the float cooldowns of `spread_step_numpy`.
+    The fire count of every cell is a uint8, and temperatures are looked up from it only for the cells
+    that may ignite, through `FireEnvironment.temperature_levels`. When Numba is installed, the passes over
+    the whole stack run as compiled loops from `kernels`. Results are identical to those of
+    `spread_step_numpy` for the same random draws.
+
+    Cells whose cooldown is `NEVER` hours or more, such as infinite ones, never spread. As in `run_events`,
+    they are left burning and counted as `stalled`, so that a realization ends once only they are left.
+
+    Parameters:
+    -----------
+    grids : numpy.ndarray
+        A (realizations, rows, cols) stack of grids at the start of the simulation.
+    scenario : Scenario
+        Precomputed ignition probabilities and cooldowns; shared by all grids of the stack.
+    cooldowns : bool, optional
+        Also keep what is needed to report the float cooldowns of `spread_step_numpy` through `cooldowns`,
+        e.g. for observers. Default is False.
+
+    Attributes:
+    -----------
+    codes : numpy.ndarray
+        Current cell codes of the stack.
+    counters : numpy.ndarray
+        Hours left before each burning cell spreads.
+    fire_counts : numpy.ndarray
+        Number of fire cells in the 3x3 area of every cell.
+    burning : numpy.ndarray
+        Number of burning cells of each realization.
+    stalled : numpy.ndarray
+        Number of burning cells of each realization that never spread.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[1, 2, 1], [0, 1, 0]])
+    >>> scenario = Scenario(grid, np.where(grid == 1, "bush", None), 0, 'N')
+    >>> scenario.ignition[:] = 2.0  # High enough to always ignite
+    >>> state = SimulationState(grid[np.newaxis], scenario)
+    >>> ignited, burned, attempts = state.spread(scenario)
+    >>> state.update(ignited, burned)
+    >>> state.codes
+    array([[[2, 4, 2],
+            [0, 2, 0]]], dtype=uint8)
+    >>> state.counters  # The bushes spread next hour
+    array([[[0, 0, 0],
+            [0, 0, 0]]], dtype=uint16)
+    """
+
+    def __init__(self, grids, scenario, cooldowns=False):
+        self.codes = grids.astype(np.uint8)
+        self._next_codes = np.empty_like(self.codes)
+        self.counters = np.zeros(grids.shape, dtype=np.uint16)
+        self.fire_counts = neighbourhood_sum((self.codes == 2).astype(np.uint8), FIRE_OFFSETS)
+        self.burning = np.count_nonzero(self.codes == 2, axis=(1, 2))
+        self.stalled = np.zeros_like(self.burning)
+        self._temperatures, self._levels = scenario.environment.temperature_levels()
+
+        # Masks reused every hour
+        self._active = np.empty(grids.shape, dtype=bool)
+        self._flammable = np.empty(grids.shape, dtype=bool)
+        self._mask = np.empty(grids.shape, dtype=bool)
+
+        self.hours = 0
+        self._initial_cooldowns = self._ignition_hours = None
+        if cooldowns:
+            # Cooldown of every cell when it ignited, and the hour it ignited in
+            self._initial_cooldowns = np.zeros(grids.shape)
+            self._ignition_hours = np.full(grids.shape, -1)
+
+    def take(self, realizations):
+        """Keep only the given realizations of the stack, e.g. to drop those whose fire has died out."""
+        for name in ("codes", "_next_codes", "counters", "fire_counts", "burning", "stalled", "_active", "_flammable",
+                     "_mask", "_initial_cooldowns", "_ignition_hours"):
+            if getattr(self, name) is not None:
+                setattr(self, name, getattr(self, name)[realizations])
+
+    def spread(self, scenario, rng=np.random):
+        """
+        Advance the fire by one hour, as `spread_step_numpy`, and swap the buffers of cell codes.
+
+        `rng` is a generator or module, or a list of one generator per realization of the stack. Returns
+        the flat indices of the cells that ignited and of those that burned out, and the number of ignition
+        attempts.
+        """
+        codes, next_codes = self.codes, self._next_codes
+        if kernels.ENABLED:
+            targets, counts, burned = kernels.spread_targets(codes, self.counters, next_codes, _DIRECTION_TABLE)
+
+            def attempted(i):
+                return targets[i, :counts[i]]
+        else:
+            active, flammable, mask = self._active, self._flammable, self._mask
+            np.equal(codes, 2, out=active)
+            np.equal(self.counters, 0, out=mask)
+            np.logical_and(active, mask, out=active)
+            np.equal(codes, 1, out=flammable)
+            np.equal(codes, 5, out=mask)
+            np.logical_or(flammable, mask, out=flammable)
+            np.copyto(next_codes, codes)
+            burned = np.flatnonzero(active)
+
+            def attempted(i):
+                _shift_into(mask, active, *DIRECTIONS[i])
+                np.logical_and(mask, flammable, out=mask)
+                return np.flatnonzero(mask)
+        plane_size = scenario.tree_types.size
+
+        ignited = []
+        attempts = 0
+        for i in SWEEP_ORDER:
+            candidates = attempted(i)
+            attempts += candidates.size
+            if candidates.size == 0:
+                continue
+
+            temperatures = self._temperatures[self._levels.flat[candidates % plane_size],
+                                              self.fire_counts.flat[candidates]]
+            burn_probability = scenario.cell_ignition_probability(i, candidates, temperatures)
+            cells = candidates[_uniform(rng, candidates, plane_size) < burn_probability]
+            next_codes.flat[cells] = 2
+            self.counters.flat[cells] = scenario.cooldown_hours[i, scenario.tree_types.flat[cells % plane_size]]
+            if self._initial_cooldowns is not None:
+                self._initial_cooldowns.flat[cells] = scenario.cooldown(i, cells)
+            ignited.append(cells)
+
+        # Mark spreading cells as burned out
+        next_codes.flat[burned] = 4
+        self.codes, self._next_codes = next_codes, codes
+        ignited = np.unique(np.concatenate(ignited)) if ignited else burned[:0]
+        return ignited, burned, attempts
+
+    def update(self, ignited, burned):
+        """Apply the cells that `spread` ignited and burned out to the fire counts, and count down an hour."""
+        if kernels.ENABLED:
+            kernels.add_fire(self.fire_counts, ignited, 1)
+            kernels.add_fire(self.fire_counts, burned, -1)
+        else:
+            _add_fire(self.fire_counts, ignited, np.add)
+            _add_fire(self.fire_counts, burned, np.subtract)
+        realizations = len(self.burning)
+        plane_size = self.codes[0].size
+        self.burning += np.bincount(ignited // plane_size, minlength=realizations)
+        self.burning -= np.bincount(burned // plane_size, minlength=realizations)
+        self.stalled += np.bincount(ignited[self.counters.flat[ignited] == NEVER] // plane_size, minlength=realizations)
+        if self._initial_cooldowns is not None:
+            self._ignition_hours.flat[ignited] = self.hours
+            self._initial_cooldowns.flat[burned] = 0
+
+        # Counters of cells that never spread stay as they are
+        if kernels.ENABLED:
+            kernels.count_down(self.counters, NEVER)
+        else:
+            np.less(self.counters, NEVER, out=self._mask)
+            np.logical_and(self._mask, self.counters, out=self._mask)
+            np.subtract(self.counters, self._mask, out=self.counters)
+        self.hours += 1
+
+    def cooldowns(self, realization):
+        """Remaining float cooldowns of a realization, as `spread_step_numpy` would hold them."""
+        return _event_cooldowns(self.codes[realization], self.hours - 1, self._initial_cooldowns[realization].ravel(),
+                                self._ignition_hours[realization].ravel())
+
+
+def _shift_into(out, array, dr, dc):
+    """Write `array` moved by (dr, dc) to `out`, as `_shifted` with a False fill, without allocating."""
+    rows, cols = array.shape[-2:]
+    out[..., max(dr, 0):rows + min(dr, 0), max(dc, 0):cols + min(dc, 0)] = \
+        array[..., max(-dr, 0):rows + min(-dr, 0), max(-dc, 0):cols + min(-dc, 0)]
+    out[..., :max(dr, 0), :] = out[..., rows + min(dr, 0):, :] = False
+    out[..., :, :max(dc, 0)] = out[..., :, cols + min(dc, 0):] = False
+
+
+def _add_fire(fire_counts, cells, operation):
+    """Add (`np.add`) or remove (`np.subtract`) the heat of fire `cells` in their 3x3 areas, in place."""
+    rows, cols = fire_counts.shape[-2:]
+    plane, cell = np.divmod(cells, rows * cols)
+    r, c = np.divmod(cell, cols)
+    for dr, dc, _ in FIRE_OFFSETS:
+        nr, nc = r + dr, c + dc
+        inside = (nr >= 0) & (nr < rows) & (nc >= 0) & (nc < cols)
+        operation.at(fire_counts.reshape(-1), (plane[inside] * rows + nr[inside]) * cols + nc[inside], 1)
+
+
+def run_state(state, scenario, on_hour=None, rngs=None, profile=None):
+    """
+    Run the stack of realizations of a `SimulationState` until their fires have died out.
+
+    Takes the same arguments and returns the same results as `run_batch` with `spread_step_numpy`, but
+    allocates no grid-sized arrays from one hour to the next. Realizations whose fire has died out, or whose
+    only burning cells never spread, are dropped from the state.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[1, 2, 1], [0, 1, 0]])
+    >>> scenario = Scenario(grid, np.where(grid == 1, "bush", None), 0, 'N')
+    >>> scenario.ignition[:] = 2.0  # High enough to always ignite
+    >>> run_state(SimulationState(np.stack([grid, np.zeros_like(grid)]), scenario), scenario)
+    (array([[1, 1, 1],
+           [0, 1, 0]]), array([4, 0]), array([2, 0]))
+
+    A headwind that cancels the burn rate gives an infinite cooldown. The cell it ignites is left burning,
+    and the run ends when the rest of the fire is out:
+
+    >>> grid = np.array([[1, 2, 1]])
+    >>> scenario = Scenario(grid, np.where(grid == 1, "bush", None), 1.5 / 0.49, 'W')
+    >>> scenario.ignition[:] = 2.0
+    >>> scenario.cooldowns[2, -1], scenario.cooldown_hours[2, -1] == NEVER  # Spreading west from bush
+    (inf, True)
+    >>> state = SimulationState(grid[np.newaxis], scenario)
+    >>> run_state(state, scenario)
+    (array([[0, 1, 1]]), array([2]), array([2]))
+    """
+    realizations, rows, cols = state.codes.shape
+    burn_counts = np.zeros(rows * cols, dtype=int)
+    burned_area = np.zeros(realizations, dtype=int)
+    duration = np.zeros(realizations, dtype=int)
+
+    running = np.arange(realizations)  # Realization of every grid still in the stack
+    timer = None if profile is None else HourTimer()
+    while True:
+        # Retire realizations with no fire left that can spread
+        burning = state.burning > state.stalled
+        if not burning.all():
+            running = running[burning]
+            state.take(burning)
+        if running.size == 0:
+            break
+        if timer is not None:
+            timer.lap("termination")
+
+        was_burning = state.burning.sum()
+        ignited, burned, attempts = state.spread(scenario, np.random if rngs is None else
+                                                 [rngs[realization] for realization in running])
+        np.add.at(burn_counts, burned % (rows * cols), 1)
+        burned_area[running] += np.bincount(burned // (rows * cols), minlength=running.size)
+        if timer is not None:
+            timer.lap("spread")
+
+        state.update(ignited, burned)
+        if timer is not None:
+            timer.lap("environment")
+        if on_hour is not None:
+            for k, realization in enumerate(running):
+                on_hour(realization, state.codes[k], duration[realization], state.cooldowns(k))
+        if timer is not None:
+            timer.lap("observers")
+            profile(state.hours - 1, timer.seconds, was_burning, attempts, ignited.size, running.size)
+            timer.start()
+        duration[running] += 1
+
+    return burn_counts.reshape(rows, cols), burned_area, duration
+
+
+def check_engine(engine, batch_size):
+    """Raise a ValueError if `engine` is unknown or does not support `batch_size`."""
+    if engine not in ENGINES:
+        raise ValueError(f"Invalid engine. Use one of {ENGINES}.")
+    if batch_size is not None and engine != "numpy":
+        raise ValueError("batch_size is only supported by the 'numpy' engine.")
+
+
+def run_realizations(grid, scenario, realizations, engine, batch_size=None, on_hour=None, seeds=None, profiler=None):
+    """
+    Run the given realizations of a simulation of `scenario`, starting from `grid`.
+
+    This is the work shared by `simulate_fire` and the sweeps of `sweep`, which split realizations among
+    worker processes and call it in each of them.
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray
+        The grid at the start of the simulation, the one `scenario` was built from.
+    scenario : Scenario
+        Precomputed ignition probabilities and cooldowns.
+    realizations : list of int
+        Numbers of the realizations to run, counting from 0.
+    engine, batch_size : optional
+        As for `simulate_fire`; check them with `check_engine`.
+    on_hour : callable, optional
+        Called as `on_hour(realization, grid, hours, cooldowns)` at the end of every simulated hour.
+    seeds : list of numpy.random.SeedSequence, optional
+        One seed per realization. Without it, random numbers come from the global `np.random` state.
+    profiler : profiling.SimulationProfiler, optional
+        Records every simulated hour.
+
+    Returns:
+    --------
+    tuple
+        - numpy.ndarray: Number of realizations in which each cell burned.
+        - list of dict: The simulation number, burned area and duration of each realization.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[1, 2, 1], [0, 1, 0]])
+    >>> scenario = Scenario(grid, np.where(grid == 1, "bush", None), 0, 'N')
+    >>> scenario.ignition[:] = 2.0  # High enough to always ignite
+    >>> burn_counts, results = run_realizations(grid, scenario, [0, 1], "frontier")
+    >>> results[1]
+    {'simulation': 2, 'burned_area': 4, 'duration': 2}
+    """
+    burn_counts = np.zeros(grid.shape)  # Tracks burn occurrences for each cell
+    simulation_results = []  # To store results of each simulation
+    rngs = [np.random] * len(realizations) if seeds is None else [np.random.default_rng(seed) for seed in seeds]
+
+    if batch_size is not None:
+        for first in range(0, len(realizations), batch_size):
+            batch = realizations[first:first + batch_size]
+            state = SimulationState(np.repeat(grid[np.newaxis], len(batch), axis=0), scenario, on_hour is not None)
+            counts, burned_area, duration = run_state(
+                state, scenario,
+                None if on_hour is None else lambda k, *state: on_hour(batch[k], *state),
+                None if seeds is None else rngs[first:first + batch_size],
+                None if profiler is None else partial(profiler.record, None))
+            burn_counts += counts
+            simulation_results.extend({"simulation": sim + 1, "burned_area": int(burned_area[k]),
+                                       "duration": int(duration[k])} for k, sim in enumerate(batch))
+        return burn_counts, simulation_results
+
+    for sim, rng in zip(realizations, rngs):
+        sim_on_hour = None if on_hour is None else partial(on_hour, sim)
+        sim_profile = None if profiler is None else partial(profiler.record, sim + 1)
+        if engine != "numpy":
+            grid_copy = grid.copy()  # Copy grid for simulation
+            environment = scenario.environment.copy()
+
+        if engine == "frontier":
+            burned, hours = run_frontier(grid_copy, environment, scenario, rng=rng, on_hour=sim_on_hour,
+                                         profile=sim_profile)
+        elif engine == "event":
+            burned, hours = run_events(grid_copy, environment, scenario, rng=rng, on_hour=sim_on_hour,
+                                       profile=sim_profile)
+        elif engine == "numpy":
+            counts, _, duration = run_state(SimulationState(grid[np.newaxis], scenario, on_hour is not None), scenario,
+                                            None if on_hour is None else lambda _, *state: sim_on_hour(*state),
+                                            [rng], sim_profile)
+            burned, hours = np.flatnonzero(counts), int(duration[0])
+        else:
+            def step(grid_now, cooldowns, environment, rng=rng):
+                return spread_step_loop(grid_now, cooldowns, scenario.tree_types, environment.humidities,
+                                        environment.temperatures, scenario.wind_factors, scenario.wind_affected,
+                                        rng=rng)
+            burned, hours = _run_hourly(grid_copy, environment, step, sim_on_hour, sim_profile)
+        burn_counts.flat[burned] += 1
+
+        # Store results for this simulation
+        simulation_results.append({
+            "simulation": sim + 1,
+            "burned_area": burned.size,  # Total burned area in this simulation
+            "duration": hours
+        })
+
+    return burn_counts, simulation_results
+
+
+def _run_in_workers(workers, grid, realizations, seeds, executor=None, **settings):
+    """
+    Split realizations into chunks, run them with `run_realizations` in a pool of worker processes and
+    merge the results. Counts are whole numbers, so the merged burn counts do not depend on the chunking.
+    A running `executor` can be given to reuse its processes.
+    """
+    chunks = np.array_split(np.arange(len(realizations)), min(len(realizations), workers * 4))
+    burn_counts = np.zeros(grid.shape)
+    simulation_results = []
+    with nullcontext(executor) if executor is not None else ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_realizations, grid, realizations=[realizations[i] for i in chunk],
+                                   seeds=[seeds[i] for i in chunk], **settings)
+                   for chunk in chunks if chunk.size]
+        for future in futures:
+            counts, results = future.result()
+            burn_counts += counts
+            simulation_results.extend(results)
+    return burn_counts, simulation_results
+
+
+def simulate_fire(grid, tree_types, wind_speed, wind_direction, simulations=1, wind_affected=True, season=None,
+                  engine="loop", batch_size=None, workers=None, seed=None, observers=None, profiler=None):
     """
     Simulates fire spread on a grid considering tree types, wind speed, wind direction, and season.
 
@@ -114,6 +989,8 @@ def simulate_fire(grid, tree_types, wind_speed, wind_direction, simulations=1, w
         A 2D array of the same shape as `grid`, assigning types to trees and bushes. Examples:
         - Trees: "pine", "oak", "willow"
         - Bushes: "bush"
+        The types can also be given as uint8 ids from `data.encode_tree_types`, which take 8 times
+        less memory.
     wind_speed : float
         Wind speed in km/h. Higher wind speeds accelerate fire spread.
     wind_direction : str
@@ -124,6 +1001,33 @@ def simulate_fire(grid, tree_types, wind_speed, wind_direction, simulations=1, w
         Whether the wind affects fire spread. Default is True.
     season : str, optional
         Season can be 'summer', 'winter', or None. Seasons impact burn probabilities.
+    engine : str, optional
+        How each hour of spread is computed:
+        - "loop": Visit every cell in turn (default).
+        - "numpy": Whole-array operations per hour, much faster on large grids; compiled loops when Numba
+          is installed.
+        - "frontier": Only visit the burning cells and their neighbours, so an hour costs time proportional
+          to the fire front rather than to the size of the grid.
+        - "event": Jump from one hour in which fire spreads to the next, so a fire costs time proportional
+          to the number of cells it ignites, however long they burn. Gives the same results as "frontier".
+    batch_size : int, optional
+        With the "numpy" engine, advance up to this many realizations together as one stacked array.
+        By default realizations are run one after another.
+    workers : int, optional
+        Run realizations in this many worker processes. Cannot be combined with `observers`.
+    seed : int, optional
+        Seed for the random draws. Every realization gets its own generator spawned from this seed, so
+        results are the same whatever `workers` and `batch_size` are. By default the global `np.random`
+        state is used (or fresh entropy when `workers` is given).
+    observers : list of callable, optional
+        Called as `observer(simulation, grid, hours, cooldowns)` at the end of every simulated hour, e.g. a
+        `plot.FirePlotter` to visualize fire progression or a `recorder.FrameRecorder` to save it. Observers
+        that have a `close` method are then called as `observer.close(burn_probabilities)`. By default
+        nothing is plotted.
+    profiler : profiling.SimulationProfiler, optional
+        Records the time spent in each phase of every simulated hour, with the number of burning cells,
+        ignition attempts and ignitions; read them with `profiler.to_frame()`. Cannot be combined with
+        `workers`.
 
     Returns:
     --------
@@ -149,87 +1053,57 @@ def simulate_fire(grid, tree_types, wind_speed, wind_direction, simulations=1, w
     (4, 4)
     >>> 'burned_area' in results_df.columns
     True
+    >>> burn_probs, results_df = simulate_fire(grid, tree_types, wind_speed, wind_direction, engine="numpy")
+    >>> burn_probs.shape
+    (4, 4)
+    >>> burn_probs, results_df = simulate_fire(grid, tree_types, wind_speed, wind_direction, simulations=5,
+    ...                                        engine="numpy", batch_size=2)
+    >>> results_df["simulation"].tolist()
+    [1, 2, 3, 4, 5]
+    >>> serial = simulate_fire(grid, tree_types, wind_speed, wind_direction, simulations=4, engine="numpy", seed=7)
+    >>> parallel = simulate_fire(grid, tree_types, wind_speed, wind_direction, simulations=4, engine="numpy",
+    ...                          seed=7, workers=2)
+    >>> np.array_equal(serial[0], parallel[0]) and serial[1].equals(parallel[1])
+    True
+    >>> hours_seen = []
+    >>> def observer(simulation, grid, hours, cooldowns):
+    ...     hours_seen.append(hours)
+    >>> burn_probs, results_df = simulate_fire(grid, tree_types, wind_speed, wind_direction, observers=[observer])
+    >>> hours_seen == list(range(results_df.loc[0, "duration"]))
+    True
+
+    A headwind that cancels the burn rate gives the bush it ignites an infinite cooldown. That bush never
+    spreads and is left burning when the rest of the fire is out:
+
+    >>> grid = np.array([[5, 2, 5, 5]])
+    >>> burn_probs, results_df = simulate_fire(grid, np.where(grid == 5, "bush", None), 1.5 / 0.49, 'W',
+    ...                                        simulations=3, seed=0)
+    >>> results_df["duration"].tolist()
+    [3, 3, 3]
     """
-    # Initialize simulation variables
-    rows, cols = grid.shape
-    burn_counts = np.zeros_like(grid, dtype=float)  # Tracks burn occurrences for each cell
-    simulation_results = []  # To store results of each simulation
+    check_engine(engine, batch_size)
 
-    # Set wind speed and direction weights
-    if wind_speed < 1:
-        tailwind = 1
-        against_wind = 1
-    else:
-        tailwind = 0.49 * wind_speed + 0.5
-        against_wind = 1 - tailwind
-
-    # Wind effect factors for each direction
-    wind_weights = {
-        'N': [against_wind, tailwind, 1, 1],  # North
-        'E': [1, 1, tailwind, against_wind],  # East
-        'S': [tailwind, against_wind, 1, 1],  # South
-        'W': [1, 1, against_wind, tailwind],  # West
-    }
-    NZ = wind_weights[wind_direction]  # Get wind effect based on direction
+    # Everything that does not change between hours and realizations is computed only once
+    scenario = Scenario(grid, tree_types, wind_speed, wind_direction, wind_affected, season)
 
-    for sim in range(simulations):
-        grid_copy = grid.copy()  # Copy grid for simulation
-        cooldowns = np.zeros_like(grid, dtype=float)  # Initialize cooldown grid
-        hours = 0
-        total_burned_area = 0  # Tracks the total burned area in this simulation
+    seeds = None
+    if seed is not None or workers is not None:
+        seeds = np.random.SeedSequence(seed).spawn(simulations)  # One independent generator per realization
 
-        while True:
-            # Terminate simulation if no fire is left
-            if np.sum(grid_copy == 2) == 0:
-                break
+    if (observers or profiler is not None) and workers is not None and workers > 1:
+        raise ValueError("observers and profiler cannot be used with workers, realizations run in other processes.")
 
-            # Update humidity and temperature based on the season
-            humidities, temperatures = calculate_humidity_and_temperature(grid_copy, season)
-            new_grid = grid_copy.copy()
-
-            # Iterate over grid cells to simulate fire spread
-            for r in range(rows):
-                for c in range(cols):
-                    if grid_copy[r, c] == 2 and cooldowns[r, c] <= 0:  # Burning cell
-                        # Spread fire to neighboring cells (N, S, W, E)
-                        for i, (dr, dc) in enumerate([(-1, 0), (1, 0), (0, -1), (0, 1)]):
-                            nr, nc = r + dr, c + dc
-                            if 0 <= nr < rows and 0 <= nc < cols and (grid_copy[nr, nc] == 1 or grid_copy[nr, nc] == 5):
-                                tree_type = tree_types[nr, nc]  # Get tree type
-                                flammability = tree_flammability[tree_type]  # Get flammability rate
-                                burn_rate = tree_burn_rates[tree_type]  # Get burn rate
-
-                                wind_factor = NZ[i]  # Get wind factor for this direction
-
-                                # Adjust burn rate based on wind and conditions
-                                adjusted_burn_rate = burn_rate * (1 + wind_factor) if wind_affected else burn_rate
-                                burn_probability = flammability * (1 - humidities[nr, nc]) * (
-                                        1 + (temperatures[nr, nc] - 25) / 100) * (
-                                                           1 + wind_factor / 5)
-
-                                # Ignite neighboring cell based on probability
-                                if np.random.random() < burn_probability:
-                                    new_grid[nr, nc] = 2  # Ignite cell
-                                    cooldowns[nr, nc] = 1 / adjusted_burn_rate
-
-                        # Mark current cell as burned out
-                        new_grid[r, c] = 4
-                        burn_counts[r, c] += 1
-                        cooldowns[r, c] = 0
-                        total_burned_area += 1  # Increment burned area count
-
-            # Update cooldowns and grid
-            cooldowns = np.maximum(0, cooldowns - 1)
-            grid_copy = new_grid
-            plot_fire(grid_copy, tree_types, hours)  # Visualize fire progression
-            hours += 1
+    def on_hour(sim, grid_now, hours, cooldowns):
+        for observer in observers:
+            observer(sim, grid_now, hours, cooldowns)  # e.g. visualize fire progression
 
-        # Store results for this simulation
-        simulation_results.append({
-            "simulation": sim + 1,
-            "burned_area": total_burned_area,
-            "duration": hours
-        })
+    settings = dict(scenario=scenario, engine=engine, batch_size=batch_size)
+    if workers is not None and workers > 1:
+        burn_counts, simulation_results = _run_in_workers(workers, grid, list(range(simulations)), seeds, **settings)
+    else:
+        burn_counts, simulation_results = run_realizations(grid, realizations=range(simulations),
+                                                            on_hour=on_hour if observers else None, seeds=seeds,
+                                                            profiler=profiler, **settings)
 
     # Convert results to a DataFrame for analysis
     results_df = pd.DataFrame(simulation_results)
@@ -237,11 +1111,116 @@ def simulate_fire(grid, tree_types, wind_speed, wind_direction, simulations=1, w
     # Calculate burn probabilities
     burn_probabilities = burn_counts / simulations
 
-    # Plot burn probabilities heatmap
-    plt.figure(figsize=(10, 5))
-    plt.title("Burn Probabilities Heatmap")
-    plt.imshow(burn_probabilities, cmap="hot", interpolation="nearest")
-    plt.colorbar(label="Burn Probability")
-    plt.show()
+    for observer in observers or []:
+        if hasattr(observer, "close"):
+            observer.close(burn_probabilities)  # e.g. plot burn probabilities heatmap
 
     return burn_probabilities, results_df
+
+
+def simulate_fire_adaptive(grid, tree_types, wind_speed, wind_direction, probability_tolerance=0.05,
+                           area_tolerance=0.05, confidence=0.95, batch=20, max_simulations=1000, wind_affected=True,
+                           season=None, engine="loop", batch_size=None, workers=None, seed=None):
+    """
+    Simulates fire spread like `simulate_fire`, running realizations in batches until the results have converged.
+
+    After every batch, confidence intervals are computed for the burn probability of every cell (normal
+    approximation of the binomial) and for the mean burned area. The simulation stops when the widest
+    burn probability interval is within `probability_tolerance` of its estimate and the burned area interval is
+    within `area_tolerance` of the mean, or after `max_simulations` realizations.
+
+    Parameters:
+    -----------
+    grid, tree_types, wind_speed, wind_direction :
+        As for `simulate_fire`.
+    probability_tolerance : float, optional
+        Largest accepted half-width of the burn probability interval of any cell. Default is 0.05.
+    area_tolerance : float, optional
+        Largest accepted half-width of the mean burned area interval, relative to the mean. Default is 0.05.
+    confidence : float, optional
+        Confidence level of the intervals. Default is 0.95.
+    batch : int, optional
+        Number of realizations run between two convergence checks, and the least number run. Default is 20.
+    max_simulations : int, optional
+        Number of realizations after which the simulation stops even if it has not converged. Default is 1000.
+    wind_affected, season, engine, batch_size, workers, seed : optional
+        As for `simulate_fire`. With a `seed`, the first n realizations are the same as those of
+        `simulate_fire(..., simulations=n, seed=seed)`.
+
+    Returns:
+    --------
+    tuple
+        - numpy.ndarray: Burn probabilities grid after the simulations.
+        - pandas.DataFrame: Simulation results containing burned area and duration for each simulation.
+        - dict: The convergence reached, with
+          - "simulations": Number of realizations run.
+          - "converged": Whether the tolerances were met.
+          - "confidence": Confidence level of the intervals.
+          - "burn_probability_ci": (lower, upper) grids of the burn probability intervals.
+          - "max_probability_half_width": Half-width of the widest burn probability interval.
+          - "burned_area_mean": Mean burned area.
+          - "burned_area_ci": (lower, upper) interval of the mean burned area.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[1, 1, 1, 1],
+    ...                  [1, 2, 1, 3],
+    ...                  [1, 1, 1, 1]])
+    >>> tree_types = np.where(grid == 1, "pine", None)
+    >>> burn_probs, results_df, convergence = simulate_fire_adaptive(grid, tree_types, 5, 'N', engine="numpy",
+    ...                                                              batch=10, seed=3)
+    >>> convergence["simulations"] == len(results_df) and convergence["simulations"] % 10 == 0
+    True
+    >>> convergence["converged"] and convergence["max_probability_half_width"] <= 0.05
+    True
+    >>> fixed, _ = simulate_fire(grid, tree_types, 5, 'N', simulations=convergence["simulations"], engine="numpy",
+    ...                          seed=3)
+    >>> np.array_equal(fixed, burn_probs)
+    True
+    """
+    check_engine(engine, batch_size)
+    scenario = Scenario(grid, tree_types, wind_speed, wind_direction, wind_affected, season)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)  # e.g. 1.96 for 95%
+
+    # Spawning children one batch at a time gives the same seeds as spawning them all at once
+    sequence = None if seed is None and workers is None else np.random.SeedSequence(seed)
+    burn_counts = np.zeros(grid.shape)
+    simulation_results = []
+    settings = dict(scenario=scenario, engine=engine, batch_size=batch_size)
+    parallel = workers is not None and workers > 1
+    with ProcessPoolExecutor(max_workers=workers) if parallel else nullcontext() as executor:  # Shared by all batches
+        while True:
+            first = len(simulation_results)
+            realizations = list(range(first, min(first + batch, max_simulations)))
+            seeds = None if sequence is None else sequence.spawn(len(realizations))
+            if parallel:
+                counts, results = _run_in_workers(workers, grid, realizations, seeds, executor=executor, **settings)
+            else:
+                counts, results = run_realizations(grid, realizations=realizations, seeds=seeds, **settings)
+            burn_counts += counts
+            simulation_results.extend(results)
+
+            # Confidence intervals of the burn probabilities and of the mean burned area
+            simulations = len(simulation_results)
+            burn_probabilities = burn_counts / simulations
+            probability_half_widths = z * np.sqrt(burn_probabilities * (1 - burn_probabilities) / simulations)
+            burned_areas = np.array([result["burned_area"] for result in simulation_results])
+            area_mean = burned_areas.mean()
+            area_half_width = z * burned_areas.std(ddof=1) / np.sqrt(simulations) if simulations > 1 else np.inf
+
+            converged = probability_half_widths.max() <= probability_tolerance and \
+                area_half_width <= area_tolerance * area_mean
+            if converged or simulations >= max_simulations:
+                break
+
+    convergence = {
+        "simulations": simulations,
+        "converged": bool(converged),
+        "confidence": confidence,
+        "burn_probability_ci": (np.maximum(burn_probabilities - probability_half_widths, 0),
+                                np.minimum(burn_probabilities + probability_half_widths, 1)),
+        "max_probability_half_width": float(probability_half_widths.max()),
+        "burned_area_mean": float(area_mean),
+        "burned_area_ci": (float(area_mean - area_half_width), float(area_mean + area_half_width)),
+    }
+    return burn_probabilities, pd.DataFrame(simulation_results), convergence
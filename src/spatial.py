@@ -0,0 +1,113 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from data import tree_species, encode_tree_types
+
+LOCATION_TYPES = ("bush", "non_bush")
+
+
+class LocationIndex:
+    """
+    Spatial index of the bush and non-bush cells of a grid, for nearest-location queries from many centers.
+
+    A KD-tree is built per location type on first use, so each query takes logarithmic time in the number
+    of cells of that type.
+
+    - "bush": Cells with value 5 in the grid.
+    - "non_bush": Cells with value 1 and tree type not labeled as "bush".
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray
+        A 2D array representing the simulation grid.
+    tree_types : numpy.ndarray
+        A 2D array of tree type names, or of tree type ids from `data.encode_tree_types`.
+
+    Examples:
+    ---------
+    >>> grid = np.array([[5, 1, 1],
+    ...                  [1, 0, 5],
+    ...                  [1, 5, 1]])
+    >>> index = LocationIndex(grid, np.where(grid == 5, "bush", "oak"))
+    >>> index.closest("bush", [(1, 1), (0, 1)])  # (1, 2) and (2, 1) tie for (1, 1)
+    array([[1, 2],
+           [0, 0]])
+    >>> distances, locations = index.nearest("non_bush", [(0, 0)], k=2)
+    >>> distances
+    array([[1., 1.]])
+    """
+
+    def __init__(self, grid, tree_types):
+        tree_type_ids = encode_tree_types(tree_types, strict=False)
+        self.locations = {
+            "bush": np.argwhere(grid == 5),
+            "non_bush": np.argwhere((grid == 1) & (tree_type_ids != tree_species.index("bush"))),
+        }
+        self.trees = {}
+
+    def _tree(self, target_type):
+        """KD-tree of the locations of `target_type`, built on first use."""
+        if target_type not in LOCATION_TYPES:
+            raise ValueError("Invalid target_type. Use 'bush' or 'non_bush'.")
+        if target_type not in self.trees:
+            self.trees[target_type] = cKDTree(self.locations[target_type])
+        return self.trees[target_type]
+
+    def nearest(self, target_type, centers, k=1):
+        """
+        Find the `k` locations of `target_type` closest to each center.
+
+        Parameters:
+        -----------
+        target_type : str
+            The type to search for ('bush' or 'non_bush').
+        centers : array_like
+            (n, 2) coordinates (row, col) of the centers.
+        k : int, optional
+            Number of locations to find for each center. Default is 1.
+
+        Returns:
+        --------
+        tuple of numpy.ndarray
+            - distances: (n, k) Euclidean distances, sorted in increasing order; inf where there are fewer
+              than `k` locations.
+            - locations: (n, k, 2) coordinates of the locations.
+        """
+        tree = self._tree(target_type)
+        locations = self.locations[target_type]
+        if locations.size == 0:
+            return np.full((len(centers), k), np.inf), np.zeros((len(centers), k, 2), dtype=np.intp)
+        distances, indices = tree.query(np.asarray(centers, dtype=float), k=[i + 1 for i in range(k)])
+        return distances, locations[np.minimum(indices, len(locations) - 1)]
+
+    def closest(self, target_type, centers):
+        """
+        Find the location of `target_type` closest to each center.
+
+        Ties between equally distant locations are broken in row-major order.
+
+        Parameters:
+        -----------
+        target_type : str
+            The type to search for ('bush' or 'non_bush').
+        centers : array_like
+            (n, 2) coordinates (row, col) of the centers.
+
+        Returns:
+        --------
+        numpy.ndarray
+            (n, 2) coordinates of the closest locations. Raises a ValueError if there is no location of
+            `target_type`.
+        """
+        tree = self._tree(target_type)
+        locations = self.locations[target_type]
+        if locations.size == 0:
+            raise ValueError(f"No {target_type} location in the grid.")
+
+        centers = np.asarray(centers, dtype=float)
+        distances, _ = tree.query(centers)
+        # Locations within half a cell of the nearest distance may tie with it; keep the first in row-major order
+        closest = []
+        for center, candidates in zip(centers, tree.query_ball_point(centers, distances + 0.5)):
+            squared = ((locations[candidates] - center) ** 2).sum(axis=1)
+            closest.append(min(zip(squared, candidates))[1])
+        return locations[closest]
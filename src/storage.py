@@ -0,0 +1,225 @@
+import json
+import os
+import zipfile
+import numpy as np
+from data import tree_species, encode_tree_types
+
+# Scenario files start with this magic string, followed by the length of the JSON header as a little-endian
+# uint32, the header itself padded to a multiple of 64 bytes, and then the uint8 grid and tree type planes
+SCENARIO_MAGIC = b"FIRESCN1"
+SCENARIO_ALIGNMENT = 64
+
+
+def save_scenario(path, grid, tree_types, seed=None, **parameters):
+    """
+    Save a grid and its tree types to a binary scenario file.
+
+    Cell codes and tree type ids are stored as uint8 planes after a JSON header holding the shape, the
+    tree species the ids refer to, the seed and any other parameters used to build the scenario.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the file to write. An existing file is overwritten.
+    grid : numpy.ndarray
+        A 2D array of cell codes.
+    tree_types : numpy.ndarray
+        A 2D array of tree type names, or of tree type ids from `data.encode_tree_types`.
+    seed : int, optional
+        Seed the scenario was generated with.
+    **parameters
+        Other JSON-serializable parameters to record, e.g. the arguments of `seeds.initialize_grid`.
+
+    Returns:
+    --------
+    None
+
+    Examples:
+    ---------
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "scenario.bin")
+    >>> grid = np.array([[1, 2], [3, 5]])
+    >>> save_scenario(path, grid, np.array([["oak", None], [None, "bush"]]), seed=1, water_body_ratio=0.1)
+    >>> grid, tree_types, metadata = load_scenario(path)
+    >>> grid
+    memmap([[1, 2],
+            [3, 5]], dtype=uint8)
+    >>> tree_types
+    memmap([[2, 0],
+            [0, 4]], dtype=uint8)
+    >>> metadata["seed"], metadata["parameters"]
+    (1, {'water_body_ratio': 0.1})
+    """
+    grid = np.asarray(grid)
+    header = json.dumps({"shape": list(grid.shape), "tree_species": list(tree_species), "seed": seed,
+                         "parameters": parameters}).encode()
+    offset = -(-(len(SCENARIO_MAGIC) + 4 + len(header)) // SCENARIO_ALIGNMENT) * SCENARIO_ALIGNMENT
+    header = header.ljust(offset - len(SCENARIO_MAGIC) - 4)  # Pad with spaces so the planes are aligned
+
+    with open(path, "wb") as file:
+        file.write(SCENARIO_MAGIC)
+        file.write(np.uint32(len(header)).tobytes())
+        file.write(header)
+        file.write(np.ascontiguousarray(grid, dtype=np.uint8).tobytes())
+        file.write(np.ascontiguousarray(encode_tree_types(tree_types)).tobytes())
+
+
+def read_scenario_header(path):
+    """
+    Read the metadata of a scenario file written by `save_scenario`.
+
+    Returns:
+    --------
+    tuple
+        - dict: "shape", "tree_species", "seed" and "parameters".
+        - int: Byte offset of the grid plane in the file.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(SCENARIO_MAGIC)) != SCENARIO_MAGIC:
+            raise ValueError(f"{path} is not a scenario file.")
+        length = int(np.frombuffer(file.read(4), dtype=np.uint32)[0])
+        metadata = json.loads(file.read(length))
+    return metadata, len(SCENARIO_MAGIC) + 4 + length
+
+
+def load_scenario(path, mmap=True):
+    """
+    Load a grid and its tree types from a binary scenario file written by `save_scenario`.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the scenario file.
+    mmap : bool, optional
+        Map the planes read-only into memory instead of reading them, so opening even a very large
+        scenario is immediate and only the parts that are used get read. Default is True.
+
+    Returns:
+    --------
+    tuple
+        - numpy.ndarray: The grid as uint8 cell codes.
+        - numpy.ndarray: The tree types as uint8 ids from `data.encode_tree_types`.
+        - dict: The metadata, with "shape", "tree_species", "seed" and "parameters".
+    """
+    metadata, offset = read_scenario_header(path)
+    if metadata["tree_species"] != list(tree_species):
+        raise ValueError(f"{path} uses tree species {metadata['tree_species']}, expected {list(tree_species)}.")
+
+    shape = tuple(metadata["shape"])
+    if mmap:
+        planes = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(2,) + shape)
+    else:
+        planes = np.fromfile(path, dtype=np.uint8, count=2 * int(np.prod(shape)), offset=offset).reshape((2,) + shape)
+    return planes[0], planes[1], metadata
+
+
+def save_burn_probabilities(path, burn_probabilities):
+    """
+    Save a burn probability map (or any other per-cell map) as a binary `.npy` file, which records its
+    shape and dtype.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the `.npy` file to write.
+    burn_probabilities : numpy.ndarray
+        The map to save.
+
+    Returns:
+    --------
+    None
+
+    Examples:
+    ---------
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "burn_probabilities.npy")
+    >>> save_burn_probabilities(path, np.array([[0.5, 0.25, 0.0]]))
+    >>> load_burn_probabilities(path)
+    memmap([[0.5 , 0.25, 0.  ]])
+    """
+    np.save(path, np.asarray(burn_probabilities))
+
+
+def load_burn_probabilities(path, mmap=True):
+    """
+    Load a map saved by `save_burn_probabilities`, with the shape it was saved with.
+
+    Maps in the older space-separated text format, one grid row per line, are also accepted.
+
+    Parameters:
+    -----------
+    path : str
+        Path of a `.npy` file, or of a text file.
+    mmap : bool, optional
+        Map a `.npy` file read-only into memory instead of reading it. Default is True.
+
+    Returns:
+    --------
+    numpy.ndarray
+        The map.
+    """
+    if not path.endswith(".npy"):
+        return np.loadtxt(path, ndmin=2)
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def append_burn_counts(path, burn_counts, simulations):
+    """
+    Append the burn counts of a number of simulations to a `.npz` archive, as one more chunk.
+
+    This lets long or repeated runs store their partial results as they go; `load_burn_counts` adds
+    up all chunks.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the `.npz` archive. It is created if it does not exist.
+    burn_counts : numpy.ndarray
+        Number of simulations in which each cell burned.
+    simulations : int
+        Number of simulations the counts cover.
+
+    Returns:
+    --------
+    None
+
+    Examples:
+    ---------
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "burn_counts.npz")
+    >>> append_burn_counts(path, np.array([[1, 0], [2, 2]]), 2)
+    >>> append_burn_counts(path, np.array([[3, 0], [1, 3]]), 3)
+    >>> burn_counts, simulations = load_burn_counts(path)
+    >>> burn_counts / simulations
+    array([[0.8, 0. ],
+           [0.6, 1. ]])
+    """
+    with zipfile.ZipFile(path, "a" if os.path.exists(path) else "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        chunk = sum(name.startswith("counts_") for name in archive.namelist())
+        for name, array in {f"counts_{chunk:05d}": np.asarray(burn_counts),
+                            f"simulations_{chunk:05d}": np.asarray(simulations)}.items():
+            with archive.open(f"{name}.npy", "w", force_zip64=True) as file:
+                np.lib.format.write_array(file, array)
+
+
+def load_burn_counts(path):
+    """
+    Add up the burn counts appended to a `.npz` archive by `append_burn_counts`, one chunk at a time.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the `.npz` archive.
+
+    Returns:
+    --------
+    tuple
+        - numpy.ndarray: Number of simulations in which each cell burned, over all chunks.
+        - int: Total number of simulations.
+    """
+    burn_counts, simulations = 0, 0
+    with np.load(path) as archive:
+        for name in sorted(name for name in archive.files if name.startswith("counts_")):
+            burn_counts = burn_counts + archive[name]
+            simulations += int(archive[name.replace("counts_", "simulations_")])
+    return burn_counts, simulations
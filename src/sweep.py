@@ -0,0 +1,245 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import numpy as np
+import pandas as pd
+from data import encode_tree_types
+from scenario import Scenario
+from simulate import SimulationState, run_state, check_engine, run_realizations
+
+# Scenario parameters varied by a sweep, in the order of the columns of its results
+SWEEP_PARAMETERS = ["wind_speed", "wind_direction", "season", "ignition_point"]
+
+
+def run_sweep(grid, tree_types, wind_speeds=(0,), wind_directions=("N",), seasons=(None,), ignition_points=(None,),
+              simulations=1, wind_affected=True, engine="loop", batch_size=None, workers=None, seed=None):
+    """
+    Simulate every combination of wind speed, wind direction, season and ignition point.
+
+    Each combination is a scenario that is simulated `simulations` times. With `workers`, the realizations
+    of all scenarios are split into jobs that share one pool of worker processes, so a sweep of many small
+    scenarios keeps every worker busy.
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray
+        A 2D array representing the simulation grid.
+    tree_types : numpy.ndarray
+        A 2D array of tree type names, or of tree type ids from `data.encode_tree_types`.
+    wind_speeds : list of float, optional
+        Wind speeds in km/h. Default is (0,).
+    wind_directions : list of str, optional
+        Wind directions among 'N', 'E', 'S', 'W'. Default is ("N",).
+    seasons : list of str, optional
+        Seasons among 'summer', 'winter' and None. Default is (None,).
+    ignition_points : list of tuple of int, optional
+        (row, col) cells where the fire starts, replacing the fires of `grid`. None keeps the fires of
+        `grid`. Default is (None,).
+    simulations : int, optional
+        Number of realizations of every scenario. Default is 1.
+    wind_affected, engine, batch_size : optional
+        As for `simulate.simulate_fire`.
+    workers : int, optional
+        Run the realizations in this many worker processes.
+    seed : int, optional
+        Seed for the random draws. Every realization of every scenario gets its own generator spawned from
+        this seed, so results do not depend on `workers`. By default the global `np.random` state is used
+        (or fresh entropy when `workers` is given).
+
+    Returns:
+    --------
+    tuple
+        - pandas.DataFrame: One row per realization, with the scenario number, the scenario parameters,
+          the simulation number, burned area and duration.
+        - numpy.ndarray: A (scenarios, rows, cols) stack of the burn probabilities of every scenario.
+
+    Examples:
+    ---------
+    >>> grid = np.ones((6, 6), dtype=int)
+    >>> tree_types = np.full(grid.shape, "bush", dtype=object)
+    >>> results, burn_probabilities = run_sweep(grid, tree_types, wind_speeds=[0, 10], wind_directions=["N", "E"],
+    ...                                         ignition_points=[(3, 3)], simulations=2, engine="numpy", seed=0)
+    >>> burn_probabilities.shape
+    (4, 6, 6)
+    >>> results.columns.tolist()
+    ['scenario', 'wind_speed', 'wind_direction', 'season', 'ignition_point', 'simulation', 'burned_area', 'duration']
+    >>> results.groupby("scenario").size().tolist()
+    [2, 2, 2, 2]
+    >>> parallel, _ = run_sweep(grid, tree_types, wind_speeds=[0, 10], wind_directions=["N", "E"],
+    ...                         ignition_points=[(3, 3)], simulations=2, engine="numpy", seed=0, workers=2)
+    >>> parallel.equals(results)
+    True
+    """
+    check_engine(engine, batch_size)
+    scenarios = pd.DataFrame(list(product(wind_speeds, wind_directions, seasons, ignition_points)),
+                             columns=SWEEP_PARAMETERS)
+    tree_types = encode_tree_types(tree_types)  # Converted once for all scenarios
+
+    seeds = [None] * len(scenarios)
+    if seed is not None or workers is not None:
+        # One independent generator per realization of every scenario
+        seeds = [sequence.spawn(simulations) for sequence in np.random.SeedSequence(seed).spawn(len(scenarios))]
+
+    jobs = []
+    cleared = np.where(grid == 2, 0, grid)  # Ignition points replace the fires of the grid
+    shared = {}  # Scenarios of the cleared grid, shared by all ignition points with the same conditions
+    for wind_speed, wind_direction, season, ignition_point in scenarios.itertuples(index=False):
+        if ignition_point is None:
+            jobs.append((grid, Scenario(grid, tree_types, wind_speed, wind_direction, wind_affected, season)))
+            continue
+        conditions = (wind_speed, wind_direction, season)
+        if conditions not in shared:
+            shared[conditions] = Scenario(cleared, tree_types, wind_speed, wind_direction, wind_affected, season)
+        jobs.append(shared[conditions].ignite(cleared, [np.ravel_multi_index(ignition_point, grid.shape)]))
+
+    burn_counts = np.zeros((len(scenarios),) + grid.shape)
+    simulation_results = [[] for _ in jobs]
+    if workers is not None and workers > 1:
+        # Split every scenario into enough chunks of realizations to give each worker several jobs
+        chunks = np.array_split(np.arange(simulations), min(simulations, -(-workers * 4 // len(jobs))))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [(index, executor.submit(run_realizations, start, scenario, realizations=chunk.tolist(),
+                                               engine=engine, batch_size=batch_size,
+                                               seeds=[seeds[index][i] for i in chunk]))
+                       for index, (start, scenario) in enumerate(jobs) for chunk in chunks if chunk.size]
+            for index, future in futures:
+                counts, results = future.result()
+                burn_counts[index] += counts
+                simulation_results[index].extend(results)
+    else:
+        for index, (start, scenario) in enumerate(jobs):
+            burn_counts[index], simulation_results[index] = run_realizations(
+                start, scenario, realizations=range(simulations), engine=engine, batch_size=batch_size,
+                seeds=seeds[index])
+
+    # Tidy results: one row per realization, labelled with its scenario
+    results_df = pd.concat([pd.DataFrame(results).assign(scenario=index)
+                            for index, results in enumerate(simulation_results)], ignore_index=True)
+    results_df = scenarios.rename_axis("scenario").reset_index().merge(results_df, on="scenario")
+    return results_df, burn_counts / simulations
+
+
+def _run_starts(grid, scenario, starts, simulations, engine, batch_size=None, seeds=None):
+    """
+    Run `simulations` realizations of a fire started at each of the flat cells `starts` of `grid`, a grid
+    without fire that `scenario` was built from.
+
+    With `batch_size`, realizations of different starts are stacked together. `seeds` holds one list of
+    `numpy.random.SeedSequence` per start. Returns one dict per realization.
+    """
+    simulation_results = []
+    if batch_size is None:
+        # One working grid and environment for all starts: each start is set on fire, simulated and put out
+        # again, which only touches its 3x3 area instead of copying the environment for every start
+        working_grid, working = scenario.ignite(grid, [])
+        no_cells = np.zeros(0, dtype=np.intp)
+        for index, start in enumerate(starts):
+            cell = np.array([start], dtype=np.intp)
+            working_grid.flat[cell] = 2
+            working.environment.update(cell, no_cells)
+            _, results = run_realizations(working_grid, working, realizations=range(simulations), engine=engine,
+                                          seeds=None if seeds is None else seeds[index])
+            working.environment.update(no_cells, cell)
+            working_grid.flat[cell] = grid.flat[cell]
+            simulation_results.extend(dict(result, start=start) for result in results)
+        return simulation_results
+
+    planes = [(start, sim) for start in starts for sim in range(simulations)]
+    rngs = None if seeds is None else [np.random.default_rng(seed) for start_seeds in seeds for seed in start_seeds]
+    for first in range(0, len(planes), batch_size):
+        batch = planes[first:first + batch_size]
+        ignited = np.array([k * grid.size + start for k, (start, _) in enumerate(batch)], dtype=np.intp)
+        grids = np.repeat(grid[np.newaxis], len(batch), axis=0)
+        grids.flat[ignited] = 2
+
+        _, burned_area, duration = run_state(SimulationState(grids, scenario), scenario,
+                                             rngs=None if rngs is None else rngs[first:first + batch_size])
+        simulation_results.extend({"simulation": sim + 1, "burned_area": int(burned_area[k]),
+                                   "duration": int(duration[k]), "start": start}
+                                  for k, (start, sim) in enumerate(batch))
+    return simulation_results
+
+
+def run_starts(grid, tree_types, start_locations, wind_speed, wind_direction, simulations=1, wind_affected=True,
+               season=None, engine="loop", batch_size=None, workers=None, seed=None):
+    """
+    Simulate fires started from each of many ignition points, e.g. every flammable cell for an ignition risk map.
+
+    The fires of `grid` are cleared, and the scenario (humidity, ignition probabilities, cooldowns) is
+    computed once and shared by all starts. With `batch_size`, realizations of different starts are
+    advanced together as one stack; with `workers`, the starts are split among worker processes.
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray
+        A 2D array representing the simulation grid.
+    tree_types : numpy.ndarray
+        A 2D array of tree type names, or of tree type ids from `data.encode_tree_types`.
+    start_locations : list of tuple of int
+        (row, col) cells where fires start, one at a time.
+    wind_speed : float
+        Wind speed in km/h.
+    wind_direction : str
+        Wind direction, one of 'N', 'S', 'E', 'W'.
+    simulations : int, optional
+        Number of realizations for every start. Default is 1.
+    wind_affected, season, engine, batch_size, workers, seed : optional
+        As for `simulate.simulate_fire`.
+
+    Returns:
+    --------
+    tuple
+        - pandas.DataFrame: One row per realization, with the start row and column, the simulation number,
+          burned area and duration.
+        - numpy.ndarray: Expected burned area of a fire started at each cell, NaN for cells that are not a start.
+
+    Examples:
+    ---------
+    >>> grid = np.ones((5, 5), dtype=int)
+    >>> tree_types = np.full(grid.shape, "bush", dtype=object)
+    >>> starts = [(0, 0), (2, 2), (4, 1)]
+    >>> results, expected_area = run_starts(grid, tree_types, starts, 0, 'N', simulations=3, engine="numpy", seed=0)
+    >>> results[["start_row", "start_col"]].drop_duplicates().values.tolist()
+    [[0, 0], [2, 2], [4, 1]]
+    >>> int(np.isnan(expected_area).sum())
+    22
+    >>> batched, _ = run_starts(grid, tree_types, starts, 0, 'N', simulations=3, engine="numpy", seed=0, batch_size=4)
+    >>> batched.equals(results)
+    True
+    >>> results, expected_area = run_starts(grid, tree_types, [], 0, 'N', engine="numpy")  # No starts
+    >>> results.columns.tolist(), len(results), int(np.isnan(expected_area).sum())
+    (['start_row', 'start_col', 'simulation', 'burned_area', 'duration'], 0, 25)
+    """
+    check_engine(engine, batch_size)
+    cleared = np.where(grid == 2, 0, grid)  # Clear all potential fire sources
+    scenario = Scenario(cleared, tree_types, wind_speed, wind_direction, wind_affected, season)
+    starts = [int(np.ravel_multi_index(location, grid.shape)) for location in start_locations]
+
+    seeds = None
+    if seed is not None or workers is not None:
+        # One independent generator per realization of every start
+        seeds = [sequence.spawn(simulations) for sequence in np.random.SeedSequence(seed).spawn(len(starts))]
+
+    settings = dict(simulations=simulations, engine=engine, batch_size=batch_size)
+    if workers is not None and workers > 1 and starts:
+        chunks = np.array_split(np.arange(len(starts)), min(len(starts), workers * 4))
+        simulation_results = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_starts, cleared, scenario, [starts[i] for i in chunk],
+                                       seeds=[seeds[i] for i in chunk], **settings)
+                       for chunk in chunks if chunk.size]
+            for future in futures:
+                simulation_results.extend(future.result())
+    else:
+        simulation_results = _run_starts(cleared, scenario, starts, seeds=seeds, **settings)
+
+    results_df = pd.DataFrame(simulation_results, columns=["simulation", "burned_area", "duration", "start"])
+    start_row, start_col = np.unravel_index(results_df.pop("start").to_numpy(dtype=np.intp), grid.shape)
+    results_df.insert(0, "start_row", start_row)
+    results_df.insert(1, "start_col", start_col)
+
+    # Average burned area of the realizations of every start
+    expected_area = np.full(grid.shape, np.nan)
+    mean_area = results_df.groupby(["start_row", "start_col"])["burned_area"].mean()
+    if len(mean_area):
+        expected_area[tuple(np.array(mean_area.index.tolist()).T)] = mean_area.to_numpy()
+    return results_df, expected_area
@@ -0,0 +1,383 @@
+import multiprocessing
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from chunked import ChunkedGrid, REACH
+from data import encode_tree_types
+from scenario import Scenario
+from simulate import DIRECTIONS, SWEEP_ORDER
+
+# Water raises the humidity of cells this far away, so a tile is simulated within a window of the grid this much
+# larger on every side; it also holds the one-cell halo whose fire spreads into the tile and heats its edge
+MARGIN = REACH
+
+# Spread hour of the cells that never spread (infinite cooldown), and of tiles with no fire
+NEVER = np.iinfo(np.int32).max
+
+
+def tile_bounds(shape, tile_size):
+    """
+    Split a grid into square tiles of side `tile_size` (smaller along the bottom and right edges).
+
+    Returns:
+    --------
+    numpy.ndarray
+        (tiles, 4) row start, row stop, column start and column stop of every tile, in row-major order.
+
+    Examples:
+    ---------
+    >>> tile_bounds((3, 5), 3)
+    array([[0, 3, 0, 3],
+           [0, 3, 3, 5]])
+    """
+    rows, cols = shape
+    return np.array([(r, min(r + tile_size, rows), c, min(c + tile_size, cols))
+                     for r in range(0, rows, tile_size) for c in range(0, cols, tile_size)])
+
+
+class _Tile:
+    """Cached state of a tile: the scenario of its window, its burning cells by the hour they spread, and the
+    fire of the ring of cells around it."""
+
+    def __init__(self, scenario, top, left, width, pending, ring, ring_fire):
+        self.scenario = scenario
+        self.top, self.left, self.width = top, left, width  # Position and width of the window in the grid
+        self.pending = pending
+        self.ring = ring
+        self.ring_fire = ring_fire
+        self.ignited = self.burned = np.zeros(0, dtype=np.intp)  # Changes not yet applied to the environment
+
+
+class TileRunner:
+    """
+    Advance single tiles of a chunked grid by an hour, reading the grid from (shared) chunks that are only
+    written between hours. The tiles are the chunks of the grid.
+
+    Instead of cooldowns, the hour in which every burning cell spreads is kept in `spread_hours`. Each
+    tile keeps the scenario of a window of the grid around it, its own burning cells grouped by the
+    hour they spread, and the fire of the one-cell ring around it, whose changes it applies to its
+    environment. Advancing a tile thus costs time proportional to its fire front and perimeter.
+
+    Parameters:
+    -----------
+    grid : chunked.ChunkedGrid
+        Cell codes of the whole grid.
+    spread_hours : chunked.ChunkedGrid
+        Hour in which each burning cell of `grid` spreads, with the same chunks as `grid`.
+    tree_types : chunked.ChunkedGrid
+        Tree type ids of the whole grid, with the same chunks as `grid`.
+    settings : dict
+        Wind speed and direction, `wind_affected` and season, as taken by `scenario.Scenario`.
+    entropy : int
+        Entropy of the `numpy.random.SeedSequence` that the random draws of every tile and hour are
+        spawned from.
+    """
+
+    def __init__(self, grid, spread_hours, tree_types, settings, entropy):
+        self.grid = grid
+        self.spread_hours = spread_hours
+        self.tree_types = tree_types
+        self.bounds = tile_bounds(grid.shape, grid.chunk_size)
+        self.settings = settings
+        self.entropy = entropy
+        self.tiles = {}
+
+    def rng(self, realization, tile, hour):
+        """Generator of the draws of `tile` in `hour`, the same whichever process advances the tile."""
+        return np.random.default_rng(np.random.SeedSequence(self.entropy, spawn_key=(realization, tile, hour)))
+
+    def evict(self, tiles):
+        """Drop the cached state of `tiles`, e.g. once the fire has left them."""
+        for tile in tiles:
+            self.tiles.pop(tile, None)
+
+    def _load(self, tile):
+        """Build the state of `tile` from the grid."""
+        rows, cols = self.grid.shape
+        r0, r1, c0, c1 = self.bounds[tile]
+        top, left = max(r0 - MARGIN, 0), max(c0 - MARGIN, 0)
+        window = (top, min(r1 + MARGIN, rows), left, min(c1 + MARGIN, cols))
+        codes = self.grid.window(*window)
+        scenario = Scenario(codes, self.tree_types.window(*window), **self.settings)
+
+        burning = np.flatnonzero(self.grid.window(r0, r1, c0, c1) == 2)
+        burning = (burning // (c1 - c0) + r0) * cols + burning % (c1 - c0) + c0
+        hours = self.spread_hours.get(burning)
+        pending = {hour: burning[hours == hour] for hour in np.unique(hours[hours < NEVER]).tolist()}
+
+        ring_rows, ring_cols = np.mgrid[max(r0 - 1, 0):min(r1 + 1, rows), max(c0 - 1, 0):min(c1 + 1, cols)]
+        outside = (ring_rows < r0) | (ring_rows >= r1) | (ring_cols < c0) | (ring_cols >= c1)
+        ring = ring_rows[outside] * cols + ring_cols[outside]
+        return _Tile(scenario, top, left, codes.shape[1], pending, ring, self.grid.get(ring) == 2)
+
+    def advance(self, tile, hour, realization):
+        """
+        Spread the fire into the cells of `tile` in `hour`, and burn out its cells that spread.
+
+        Returns:
+        --------
+        tuple
+            - numpy.ndarray: Flat indices of the cells of the tile that caught fire.
+            - numpy.ndarray: Hour in which each of them spreads.
+            - numpy.ndarray: Flat indices of the cells of the tile that burned out.
+            - numpy.ndarray: First hour in which a cell of the tile spreads after this one, or `NEVER`, and the
+              same for the cells of its top row, bottom row, left column and right column.
+        """
+        if tile not in self.tiles:
+            self.tiles[tile] = self._load(tile)
+        state = self.tiles[tile]
+        scenario = state.scenario
+        cols = self.grid.shape[1]
+        r0, r1, c0, c1 = self.bounds[tile]
+
+        def local(cells):
+            """Flat indices of `cells` in the window of the tile."""
+            return (cells // cols - state.top) * state.width + cells % cols - state.left
+
+        # Bring the environment up to date with the last hour of the tile and the fires that neighbouring
+        # tiles lit or burned out since
+        ring_fire = self.grid.get(state.ring) == 2
+        changed = ring_fire != state.ring_fire
+        scenario.environment.update(local(np.concatenate([state.ignited, state.ring[changed & ring_fire]])),
+                                    local(np.concatenate([state.burned, state.ring[changed & ~ring_fire]])))
+        state.ring_fire = ring_fire
+
+        halo = state.ring[ring_fire]
+        spreading = state.pending.pop(hour, np.zeros(0, dtype=np.intp))
+        active = np.sort(np.concatenate([spreading, halo[self.spread_hours.get(halo) <= hour]]))
+        rng = self.rng(realization, tile, hour)
+
+        cells, cooldowns = [], []
+        r, c = np.divmod(active, cols)
+        for i in SWEEP_ORDER:
+            dr, dc = DIRECTIONS[i]
+            nr, nc = r + dr, c + dc
+            targets = (nr * cols + nc)[(nr >= r0) & (nr < r1) & (nc >= c0) & (nc < c1)]
+            codes = self.grid.get(targets)
+            candidates = targets[(codes == 1) | (codes == 5)]
+            if candidates.size == 0:
+                continue
+
+            burn_probability = scenario.ignition_probability(i, local(candidates), scenario.environment.temperatures)
+            ignited = candidates[rng.random(candidates.size) < burn_probability]
+            cells.append(ignited)
+            cooldowns.append(scenario.cooldown(i, local(ignited)))
+
+        # A cell ignited from several directions keeps the cooldown of the last one, as in the other engines
+        cells = np.concatenate(cells) if cells else np.zeros(0, dtype=np.intp)
+        ignited, last = np.unique(cells[::-1], return_index=True)
+        cooldowns = np.concatenate(cooldowns)[::-1][last] if ignited.size else np.zeros(0)
+        with np.errstate(invalid="ignore"):
+            due = hour + np.maximum(1, np.ceil(cooldowns))
+        due = np.where(due < NEVER, due, NEVER).astype(np.int32)
+        state.ignited, state.burned = ignited, spreading
+
+        for due_hour in np.unique(due[due < NEVER]).tolist():
+            state.pending[due_hour] = np.concatenate([state.pending.get(due_hour, ignited[:0]),
+                                                      ignited[due == due_hour]])
+        next_hours = [NEVER] * 5
+        for pending_hour in sorted(state.pending, reverse=True):
+            r, c = np.divmod(state.pending[pending_hour], cols)
+            for k, edge in enumerate([r.size, (r == r0).any(), (r == r1 - 1).any(), (c == c0).any(),
+                                      (c == c1 - 1).any()]):
+                if edge:
+                    next_hours[k] = pending_hour
+        return ignited, due, spreading, np.array(next_hours)
+
+
+def _open_shared(directory, layout, mode):
+    """
+    Map the chunks of the grid, spread hours and tree types of a tiled simulation to files in `directory`.
+    `layout` holds the shape and chunk size of the grid, the position of every materialized chunk, and the
+    cell code and tree type id of the other chunks.
+    """
+    shape, chunk_size, index, codes, tree_type_ids = layout
+    blocks = (max(int(index.max()) + 1, 1), chunk_size, chunk_size)  # An empty file cannot be mapped
+    # Plain views of the memory maps, which are faster to index
+    return [ChunkedGrid(shape, chunk_size, index, values.astype(dtype),
+                        np.asarray(np.memmap(os.path.join(directory, name), dtype=dtype, mode=mode, shape=blocks)))
+            for name, dtype, values in (("grid", np.uint8, codes), ("spread_hours", np.int32, np.zeros_like(codes)),
+                                        ("tree_types", np.uint8, tree_type_ids))]
+
+
+def _tile_worker(connection, directory, layout, settings, entropy):
+    """Advance the tiles sent through `connection` every hour, until None is received."""
+    runner = TileRunner(*_open_shared(directory, layout, "r"), settings, entropy)
+    for hour, realization, due, evict in iter(connection.recv, None):
+        try:
+            runner.evict(evict)
+            connection.send([runner.advance(tile, hour, realization) for tile in due])
+        except Exception as error:
+            connection.send(error)
+
+
+def simulate_fire_tiled(grid, tree_types, wind_speed, wind_direction, simulations=1, wind_affected=True, season=None,
+                        tile_size=256, workers=None, seed=None):
+    """
+    Simulate fire spread on a very large grid split into tiles, advancing the tiles that have fire in
+    parallel worker processes.
+
+    The grid is stored as a `chunked.ChunkedGrid` whose chunks are the tiles, so only the tiles with
+    vegetation and the tiles around them take memory; their chunks live in memory-mapped files shared by
+    the workers, and every worker owns a fixed set of tiles. Each hour the tiles with cells spreading in
+    them, or along the facing edge of a neighbouring tile, spread the fire into their own cells, reading
+    the one-cell halo of their neighbours; the ignitions are then written back to the shared grid before
+    the next hour, which is how the halos are exchanged. Other tiles are skipped, and hours in which no
+    cell spreads are jumped over. Humidity, temperature and ignition probabilities are only kept for the
+    tiles with fire in or around them, so memory grows with the fire rather than with the grid.
+
+    On a single core this is slower than the "frontier" engine of `simulate.simulate_fire`, as every tile
+    with fire has the fixed cost of an hour; tiling pays off with many workers, and on grids too large for
+    the scenario of the whole grid to fit in memory.
+
+    The rules are those of `simulate.simulate_fire`. Every tile draws its random numbers from its own
+    generator for every hour, so results depend on `seed` and `tile_size` but not on `workers`; they
+    are not the same draws as those of the other engines.
+
+    Parameters:
+    -----------
+    grid : numpy.ndarray or chunked.ChunkedGrid
+        A 2D array of cell codes, e.g. a memory-mapped grid from `storage.load_scenario`, or a chunked grid.
+    tree_types : numpy.ndarray or chunked.ChunkedGrid
+        A 2D array of tree type names, or of tree type ids from `data.encode_tree_types`. For a chunked
+        `grid`, a chunked grid of tree type ids with the same chunks may be given.
+    wind_speed : float
+        Wind speed in km/h.
+    wind_direction : str
+        Wind direction, one of 'N', 'S', 'E', 'W'.
+    simulations : int, optional
+        Number of realizations to run, one after another. Default is 1.
+    wind_affected, season : optional
+        As for `simulate.simulate_fire`.
+    tile_size : int, optional
+        Side of the tiles, in cells, for a dense `grid`; a chunked grid is tiled by its chunks. Default is 256.
+    workers : int, optional
+        Advance the tiles in this many worker processes. By default they are advanced in this process.
+    seed : int, optional
+        Seed for the random draws. By default it is drawn from the global `np.random` state.
+
+    Returns:
+    --------
+    tuple
+        - numpy.ndarray or chunked.ChunkedGrid: Burn probabilities grid after the simulations, chunked if
+          `grid` is.
+        - pandas.DataFrame: Simulation results containing burned area and duration for each simulation.
+
+    Examples:
+    ---------
+    >>> grid = np.ones((12, 12), dtype=np.uint8)
+    >>> grid[6, 6] = 2
+    >>> tree_types = np.full(grid.shape, "bush", dtype=object)
+    >>> burn_probabilities, results_df = simulate_fire_tiled(grid, tree_types, 0, 'N', simulations=2, tile_size=5,
+    ...                                                      seed=0)
+    >>> results_df.columns.tolist()
+    ['simulation', 'burned_area', 'duration']
+    >>> parallel, parallel_df = simulate_fire_tiled(grid, tree_types, 0, 'N', simulations=2, tile_size=5, seed=0,
+    ...                                             workers=2)
+    >>> np.array_equal(parallel, burn_probabilities) and parallel_df.equals(results_df)
+    True
+    """
+    chunked = isinstance(grid, ChunkedGrid)
+    if not chunked:
+        grid = ChunkedGrid.from_dense(grid, tile_size, dtype=np.uint8)
+    if not isinstance(tree_types, ChunkedGrid):
+        tree_types = ChunkedGrid.from_dense(encode_tree_types(tree_types), layout=grid)
+    shape = grid.shape
+    bounds = tile_bounds(shape, grid.chunk_size)
+    tile_rows, tile_cols = grid.index.shape
+    settings = dict(wind_speed=wind_speed, wind_direction=wind_direction, wind_affected=wind_affected, season=season)
+    entropy = np.random.SeedSequence(np.random.randint(2 ** 32) if seed is None else seed).entropy
+    workers = min(workers or 1, len(bounds))
+
+    # Tiles with cells that can catch fire, and the first hour in which a cell spreads in every tile and
+    # along its top, bottom, left and right edges
+    flammable = np.zeros(len(bounds), dtype=bool)
+    first_hours = np.full((len(bounds), 5), NEVER)
+    for tile in np.flatnonzero(grid.index.ravel() >= 0):
+        block = grid.window(*bounds[tile])
+        flammable[tile] = ((block == 1) | (block == 5)).any()
+        fire = block == 2
+        first_hours[tile] = np.where([fire.any(), fire[0].any(), fire[-1].any(), fire[:, 0].any(), fire[:, -1].any()],
+                                     0, NEVER)
+
+    burn_counts = grid.full_like(0, dtype=np.int32)
+    cached = np.zeros(len(bounds), dtype=bool)  # Tiles whose state is cached by the runner that advances them
+    simulation_results = []
+    with tempfile.TemporaryDirectory() as directory:
+        layout = (shape, grid.chunk_size, grid.index, grid.values, tree_types.values)
+        shared_grid, spread_hours, shared_tree_types = _open_shared(directory, layout, "w+")
+        shared_tree_types.blocks[:len(tree_types.blocks)] = tree_types.blocks
+        connections, processes = [], []
+        if workers > 1:
+            for _ in range(workers):
+                connection, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_tile_worker, daemon=True,
+                                                  args=(child, directory, layout, settings, entropy))
+                process.start()
+                connections.append(connection)
+                processes.append(process)
+        runner = TileRunner(shared_grid, spread_hours, shared_tree_types, settings, entropy)
+
+        def advance(hour, realization, due, evict):
+            """Advance the `due` tiles, each in the worker that owns it, and return their results."""
+            if not connections:
+                runner.evict(evict)
+                return [(tile, runner.advance(tile, hour, realization)) for tile in due]
+            owned = [(due[due % workers == k], evict[evict % workers == k]) for k in range(workers)]
+            for connection, (tiles, evicted) in zip(connections, owned):
+                connection.send((hour, realization, tiles, evicted))
+            results = []
+            for connection, (tiles, _) in zip(connections, owned):
+                tile_results = connection.recv()
+                if isinstance(tile_results, Exception):
+                    raise tile_results
+                results.extend(zip(tiles, tile_results))
+            return results
+
+        try:
+            for sim in range(simulations):
+                shared_grid.blocks[:len(grid.blocks)] = grid.blocks
+                spread_hours.blocks[:] = 0  # The fires of the grid spread in the first hour
+                next_hours = np.full((tile_rows + 2, tile_cols + 2, 5), NEVER)  # With a border of tiles without fire
+                next_hours[1:-1, 1:-1] = first_hours.reshape(tile_rows, tile_cols, 5)
+                stale = cached.copy()  # Tiles cached during the previous realizations
+                burned_area = duration = 0
+
+                while next_hours[..., 0].min() < NEVER:
+                    hour = next_hours[..., 0].min()
+                    # Tiles with a cell spreading this hour, in them or on the facing edge of a neighbouring tile
+                    facing = np.stack([next_hours[1:-1, 1:-1, 0], next_hours[:-2, 1:-1, 2], next_hours[2:, 1:-1, 1],
+                                       next_hours[1:-1, :-2, 4], next_hours[1:-1, 2:, 3]]).reshape(5, -1)
+                    due = np.flatnonzero((facing[0] <= hour) | (flammable & (facing.min(axis=0) <= hour)))
+                    # Tiles with no fire left in them or in their neighbours no longer need their scenario
+                    nearby = np.minimum.reduce([next_hours[1:-1, 1:-1, 0], next_hours[:-2, 1:-1, 0],
+                                                next_hours[2:, 1:-1, 0], next_hours[1:-1, :-2, 0],
+                                                next_hours[1:-1, 2:, 0]]).ravel()
+                    evict = np.flatnonzero(stale | (cached & (nearby == NEVER)))
+                    stale[:] = False
+                    cached[evict] = False
+                    cached[due] = True
+
+                    # Write the results back only once every tile has read the grid of this hour
+                    for tile, (ignited, ignited_hours, burned, next_hour) in advance(hour, sim, due, evict):
+                        shared_grid.set(ignited, 2)
+                        spread_hours.set(ignited, ignited_hours)
+                        shared_grid.set(burned, 4)
+                        burn_counts.set(burned, burn_counts.get(burned) + 1)
+                        burned_area += burned.size
+                        next_hours[tile // tile_cols + 1, tile % tile_cols + 1] = next_hour
+                    duration = hour + 1
+
+                simulation_results.append({"simulation": sim + 1, "burned_area": burned_area,
+                                           "duration": int(duration)})
+        finally:
+            for connection in connections:
+                connection.send(None)
+            for process in processes:
+                process.join()
+            del shared_grid, spread_hours, shared_tree_types, runner
+
+    burn_probabilities = ChunkedGrid(shape, grid.chunk_size, grid.index, np.zeros(grid.index.shape),
+                                     burn_counts.blocks / simulations)
+    return burn_probabilities if chunked else burn_probabilities.to_dense(), pd.DataFrame(simulation_results)